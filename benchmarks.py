@@ -0,0 +1,149 @@
+"""
+Benchmarks
+
+Micro-benchmarks for hot paths in main.py. Benchmarks that touch the
+database run against the configured DATABASE_URL:
+
+    python benchmarks.py [name ...]
+
+Each benchmark prints per-call latency percentiles and cleans up any
+documents it creates. Motor clients are bound to the event loop that first
+uses them, so benchmarks running their own loop close the shared async
+client before that loop goes away.
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+from uuid import uuid4
+
+from database_async import close_client as close_async_client
+
+
+def _timeit(fn: Callable[[], object], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(label: str, samples: List[float]) -> None:
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{label:<44} n={len(samples):<6} median={statistics.median(ordered):.3f}ms p95={p95:.3f}ms")
+
+
+def bench_session_resolvers(iterations: int = 2000) -> None:
+    """Two find_one calls vs a single $lookup aggregation for token -> user"""
+    import main
+
+    users = main._collection("user")
+    sessions = main._collection("session")
+    user_id = users.insert_one({"name": "bench", "email": f"bench-{uuid4()}@example.com", "role": "Engineer"}).inserted_id
+    token = f"bench-{uuid4()}"
+    sessions.insert_one({"token": token, "user_id": user_id, "created_at": main._now()})
+    loop = asyncio.new_event_loop()
+    try:
+        for name, resolver in main.SESSION_RESOLVERS.items():
+            loop.run_until_complete(resolver(token))  # warm up the connection pool
+            _report(f"session resolver: {name}", _timeit(lambda: loop.run_until_complete(resolver(token)), iterations))
+    finally:
+        close_async_client()
+        loop.close()
+        sessions.delete_one({"token": token})
+        users.delete_one({"_id": user_id})
+
+
+def bench_serialization(rows: int = 1000, iterations: int = 50) -> None:
+    """response_model round trip vs the fast encoder for a page of expenses (no database)"""
+    import json
+    from datetime import datetime, timezone
+    from typing import List as ListOf
+
+    from bson import ObjectId
+    from pydantic import TypeAdapter
+
+    import main
+    import serialization
+
+    now = datetime.now(timezone.utc)
+    docs = [{
+        "_id": ObjectId(), "project_id": str(ObjectId()), "amount": 12.5 + i, "currency": "USD",
+        "description": "fuel", "status": "pending_accountant", "requested_by": str(ObjectId()),
+        "approvals": [{"by": str(ObjectId()), "role": "Manager", "action": "approve", "note": None, "at": now}],
+    } for i in range(rows)]
+    response_adapter = TypeAdapter(ListOf[main.ExpenseOut])
+
+    def response_model_path():
+        # What the handler + FastAPI's serialize_response do for List[ExpenseOut]
+        items = [main.ExpenseOut(**main._expense_row(d)) for d in docs]
+        validated = response_adapter.validate_python(items)
+        return json.dumps(response_adapter.dump_python(validated, mode="json")).encode()
+
+    def fast_path():
+        return main.EXPENSE_ENCODER.encode_many(main._expense_row(d) for d in docs)
+
+    def fast_validated_path():
+        serialization.FAST_JSON_VALIDATE = True
+        try:
+            return fast_path()
+        finally:
+            serialization.FAST_JSON_VALIDATE = False
+
+    encoder = "orjson" if serialization.orjson is not None else "pydantic-core"
+    _report(f"serialize {rows} rows: response_model", _timeit(response_model_path, iterations))
+    _report(f"serialize {rows} rows: fast ({encoder})", _timeit(fast_path, iterations))
+    _report(f"serialize {rows} rows: fast+validate", _timeit(fast_validated_path, iterations))
+
+
+def bench_project_numbers(workers: int = 8, creates: int = 200, block_size: int = 20) -> None:
+    """Gapless vs hi/lo project numbers under concurrent creates in one process"""
+    import main
+    from sequences import COUNTER_COLLECTION, SequenceAllocator
+
+    async def run(mode: str) -> None:
+        adb = main.get_adb()
+        counter_id = f"bench-{uuid4()}"
+        allocator = SequenceAllocator(counter_id, mode=mode, block_size=block_size)
+        latencies: List[float] = []
+
+        async def worker():
+            for _ in range(creates // workers):
+                start = time.perf_counter()
+                await allocator.next(adb)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(workers)))
+            elapsed = time.perf_counter() - start
+            _report(f"project numbers: {mode}", latencies)
+            print(f"{'':<44} {len(latencies) / elapsed:.0f} numbers/s, {allocator.reservations} counter writes")
+        finally:
+            await adb[COUNTER_COLLECTION].delete_one({"_id": counter_id})
+
+    async def run_all() -> None:
+        # Both modes share one loop and one client
+        try:
+            for mode in ("gapless", "hilo"):
+                await run(mode)
+        finally:
+            close_async_client()
+
+    asyncio.run(run_all())
+
+
+BENCHMARKS: Dict[str, Callable[[], None]] = {
+    "session_resolvers": bench_session_resolvers,
+    "serialization": bench_serialization,
+    "project_numbers": bench_project_numbers,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or list(BENCHMARKS):
+        BENCHMARKS[name]()
@@ -0,0 +1,108 @@
+"""
+Project Budgets
+
+Projects may carry an optional `budget` in `budget_currency`. Each
+project document also keeps two running counters over its expenses:
+
+- committed: amounts still pending approval
+- spent: amounts approved
+
+Creating an expense reserves its amount with one conditional `$inc` on
+the project. The filter only matches while committed + spent + amount
+still fits the budget, so two concurrent expenses cannot both take the
+last of it, and no expense is ever scanned. Approvals move amounts
+between the counters (rejections release them), so remaining budget is
+budget - spent - committed on a single document.
+
+Projects and expenses are separate documents, so the reservation is its
+own write. create_expense releases it again if the expense insert fails,
+and marks stored expenses with `budget_reserved`; only those move the
+counters on approval, so expenses created before budgets existed (or
+against unknown projects) never drive them negative.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+# Expense status -> project counter the amount is held in (None: not counted)
+BUDGET_COUNTERS: Dict[str, Optional[str]] = {
+    "pending_manager": "committed",
+    "pending_accountant": "committed",
+    "approved": "spent",
+    "rejected": None,
+}
+
+
+def _project_filter(project_id: str) -> Optional[Dict[str, Any]]:
+    # Expenses may reference projects by any string; only ObjectIds can match
+    return {"_id": ObjectId(project_id)} if ObjectId.is_valid(project_id) else None
+
+
+def remaining(project: Dict[str, Any]) -> Optional[float]:
+    if project.get("budget") is None:
+        return None
+    return project["budget"] - project.get("spent", 0) - project.get("committed", 0)
+
+
+async def reserve(adb, exp: Dict[str, Any]) -> bool:
+    """Count a new expense against its project; raises 400/409 when the budget refuses it.
+
+    Returns whether a project document was updated.
+    """
+    counter = BUDGET_COUNTERS.get(exp["status"])
+    query = _project_filter(exp["project_id"])
+    if counter is None or query is None:
+        return False
+    amount = exp["amount"]
+    fits = {
+        "budget_currency": exp["currency"],
+        "$expr": {"$lte": [
+            {"$add": [{"$ifNull": ["$spent", 0]}, {"$ifNull": ["$committed", 0]}, amount]},
+            "$budget",
+        ]},
+    }
+    result = await adb["project"].update_one(
+        {**query, "$or": [{"budget": None}, fits]},
+        {"$inc": {counter: amount}},
+    )
+    if result.matched_count:
+        return True
+
+    project = await adb["project"].find_one(query, {"budget": 1, "budget_currency": 1, "spent": 1, "committed": 1})
+    if project is None:
+        return False
+    if project.get("budget_currency") != exp["currency"]:
+        raise HTTPException(status_code=400, detail=f"Project budget is in {project.get('budget_currency')}")
+    raise HTTPException(status_code=409, detail=f"Expense exceeds remaining budget ({remaining(project):.2f} left)")
+
+
+async def release(adb, exp: Dict[str, Any]) -> None:
+    """Undo reserve() for an expense that was not stored"""
+    counter = BUDGET_COUNTERS.get(exp["status"])
+    query = _project_filter(exp["project_id"])
+    if counter is not None and query is not None:
+        await adb["project"].update_one(query, {"$inc": {counter: -exp["amount"]}})
+
+
+async def record_transitions(adb, transitions: Iterable[Tuple[Dict[str, Any], str, str]]) -> None:
+    """Move (expense, from status, to status) amounts between counters, one write per project"""
+    increments: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for exp, old, new in transitions:
+        before, after = BUDGET_COUNTERS.get(old), BUDGET_COUNTERS.get(new)
+        if before == after or not exp.get("budget_reserved"):
+            continue
+        inc = increments[exp["project_id"]]
+        if before:
+            inc[before] -= exp["amount"]
+        if after:
+            inc[after] += exp["amount"]
+    if not increments:
+        return
+    await adb["project"].bulk_write(
+        [UpdateOne(_project_filter(project_id), {"$inc": dict(inc)}) for project_id, inc in increments.items()],
+        ordered=False,
+    )
@@ -5,29 +5,142 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
 from datetime import datetime, timezone
+import asyncio
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from typing import Union
+from typing import Any, Callable, Dict, Optional, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
 load_dotenv()
 
-_client = None
-db = None
-
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
-if database_url and database_name:
-    _client = MongoClient(database_url)
-    db = _client[database_name]
+
+def pool_options() -> Dict[str, Any]:
+    """MongoClient pool/timeouts from the environment (only the ones that are set)"""
+    env_options = {
+        "maxPoolSize": "MONGO_MAX_POOL_SIZE",
+        "minPoolSize": "MONGO_MIN_POOL_SIZE",
+        "maxIdleTimeMS": "MONGO_MAX_IDLE_TIME_MS",
+        "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+        "serverSelectionTimeoutMS": "MONGO_SERVER_SELECTION_TIMEOUT_MS",
+        "connectTimeoutMS": "MONGO_CONNECT_TIMEOUT_MS",
+    }
+    return {option: int(os.environ[var]) for option, var in env_options.items() if os.getenv(var)}
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Connection pool event listener keeping live counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters = {
+                "created": 0,
+                "closed": 0,
+                "checked_out": 0,
+                "waiting": 0,
+                "checkout_failed": 0,
+                "pools_cleared": 0,
+            }
+
+    def _add(self, **deltas: int) -> None:
+        with self._lock:
+            for key, delta in deltas.items():
+                self.counters[key] += delta
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_closed(self, event): pass
+
+    def pool_cleared(self, event):
+        self._add(pools_cleared=1)
+
+    def connection_created(self, event):
+        self._add(created=1)
+
+    def connection_ready(self, event): pass
+
+    def connection_closed(self, event):
+        self._add(closed=1)
+
+    def connection_check_out_started(self, event):
+        self._add(waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._add(waiting=-1, checkout_failed=1)
+
+    def connection_checked_out(self, event):
+        self._add(waiting=-1, checked_out=1)
+
+    def connection_checked_in(self, event):
+        self._add(checked_out=-1)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self.counters)
+        stats["open"] = stats["created"] - stats["closed"]
+        return stats
+
+
+pool_listener = PoolStatsListener()
+
+# The client is created lazily and per process: a MongoClient inherited
+# across fork() shares sockets and locks with the parent and is unsafe to use.
+_client: Optional[MongoClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> Optional[MongoClient]:
+    global _client, _client_pid
+    if not (database_url and database_name):
+        return None
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                if _client_pid != os.getpid():
+                    pool_listener.reset()
+                _client = MongoClient(database_url, event_listeners=[pool_listener], **pool_options())
+                _client_pid = os.getpid()
+    return _client
+
+
+def get_db():
+    """Database handle for this process, or None when not configured"""
+    client = get_client()
+    return client[database_name] if client is not None else None
+
+
+def close_client() -> None:
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+
+def __getattr__(name: str):
+    # Keeps `from database import db` working without creating a client at import time
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Helper functions for common database operations
 def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
+    db = get_db()
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
 
@@ -45,6 +158,7 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
 
 def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
     """Get documents from collection"""
+    db = get_db()
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
     
@@ -53,3 +167,73 @@ def get_documents(collection_name: str, filter_dict: dict = None, limit: int = N
         cursor = cursor.limit(limit)
     
     return list(cursor)
+
+
+# Offloading blocking pymongo calls from async code
+class BlockingExecutor:
+    """Runs blocking database calls on a dedicated, sized thread pool.
+
+    Kept separate from anyio's default pool (which serves the sync `def`
+    endpoints) so slow queries cannot starve request handling, and capped
+    per collection so one hot collection cannot take every thread.
+    """
+
+    def __init__(self, max_workers: int = 16, per_collection_limit: int = 8):
+        self.max_workers = max_workers
+        self.per_collection_limit = per_collection_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _collection_stats(self, collection_name: str) -> Dict[str, int]:
+        stats = self._stats.get(collection_name)
+        if stats is None:
+            stats = self._stats[collection_name] = {"waiting": 0, "running": 0, "completed": 0, "max_waiting": 0}
+        return stats
+
+    async def run(self, collection_name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await fn(*args, **kwargs) on the pool, queued behind the collection's limit"""
+        semaphore = self._semaphores.get(collection_name)
+        if semaphore is None:
+            semaphore = self._semaphores[collection_name] = asyncio.Semaphore(self.per_collection_limit)
+        with self._lock:
+            stats = self._collection_stats(collection_name)
+            stats["waiting"] += 1
+            stats["max_waiting"] = max(stats["max_waiting"], stats["waiting"])
+        acquired = False
+        try:
+            async with semaphore:
+                with self._lock:
+                    stats["waiting"] -= 1
+                    stats["running"] += 1
+                acquired = True
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, lambda: fn(*args, **kwargs))
+        finally:
+            with self._lock:
+                if acquired:
+                    stats["running"] -= 1
+                    stats["completed"] += 1
+                else:
+                    # Cancelled while queued behind the collection limit
+                    stats["waiting"] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "per_collection_limit": self.per_collection_limit,
+                "collections": {name: dict(s) for name, s in self._stats.items()},
+            }
+
+
+blocking_executor = BlockingExecutor(
+    max_workers=int(os.getenv("DB_EXECUTOR_THREADS", "16")),
+    per_collection_limit=int(os.getenv("DB_EXECUTOR_COLLECTION_LIMIT", "8")),
+)
+
+
+async def run_blocking(collection_name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking pymongo call without freezing the event loop"""
+    return await blocking_executor.run(collection_name, fn, *args, **kwargs)
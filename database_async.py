@@ -0,0 +1,94 @@
+"""
+Async Database Helpers
+
+Non-blocking counterpart to database.py built on Motor. Use these from
+`async def` endpoints so a database round trip yields the event loop
+instead of blocking the whole worker; `def` endpoints keep using the
+synchronous helpers in database.py (FastAPI runs them in a threadpool).
+"""
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from datetime import datetime, timezone
+import os
+from dotenv import load_dotenv
+from typing import Optional, Union
+from pydantic import BaseModel
+
+from database import PoolStatsListener, pool_options
+
+# Load environment variables from .env file
+load_dotenv()
+
+database_url = os.getenv("DATABASE_URL")
+database_name = os.getenv("DATABASE_NAME")
+
+pool_listener = PoolStatsListener()
+
+# Created lazily per process, like database.get_client()
+_client: Optional[AsyncIOMotorClient] = None
+_client_pid: Optional[int] = None
+
+
+def get_client() -> Optional[AsyncIOMotorClient]:
+    global _client, _client_pid
+    if not (database_url and database_name):
+        return None
+    if _client is None or _client_pid != os.getpid():
+        if _client_pid != os.getpid():
+            pool_listener.reset()
+        # Motor binds to the running event loop on first use
+        _client = AsyncIOMotorClient(database_url, event_listeners=[pool_listener], **pool_options())
+        _client_pid = os.getpid()
+    return _client
+
+
+def get_adb():
+    """Async database handle for this process, or None when not configured"""
+    client = get_client()
+    return client[database_name] if client is not None else None
+
+
+def close_client() -> None:
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        _client.close()
+    _client = None
+    _client_pid = None
+
+
+def __getattr__(name: str):
+    if name == "adb":
+        return get_adb()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Helper functions for common database operations
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
+    """Insert a single document with timestamp"""
+    adb = get_adb()
+    if adb is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    # Convert Pydantic model to dict if needed
+    if isinstance(data, BaseModel):
+        data_dict = data.model_dump()
+    else:
+        data_dict = data.copy()
+
+    data_dict['created_at'] = datetime.now(timezone.utc)
+    data_dict['updated_at'] = datetime.now(timezone.utc)
+
+    result = await adb[collection_name].insert_one(data_dict)
+    return str(result.inserted_id)
+
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
+    """Get documents from collection"""
+    adb = get_adb()
+    if adb is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    cursor = adb[collection_name].find(filter_dict or {})
+    if limit:
+        cursor = cursor.limit(limit)
+
+    return await cursor.to_list(length=None)
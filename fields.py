@@ -0,0 +1,59 @@
+"""
+Sparse Fieldsets
+
+Support for `?fields=a,b,c` on list and detail endpoints: the requested
+response fields are validated against the route's response model,
+translated into a Mongo projection (so unrequested data such as the
+`approvals` array never leaves the server), and encoded with a trimmed
+copy of the response model.
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, create_model
+
+from serialization import ModelEncoder
+
+# Maps a response field to a function reading it from a Mongo document
+RowSpec = Dict[str, Callable[[Dict[str, Any]], Any]]
+
+
+def parse_fields(raw: Optional[str], model: Type[BaseModel]) -> Optional[Tuple[str, ...]]:
+    """Validate a comma separated field list; returns fields in model order, always with id"""
+    if not raw:
+        return None
+    requested = {f.strip() for f in raw.split(",") if f.strip()}
+    unknown = requested - set(model.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(sorted(unknown))}")
+    requested.add("id")
+    return tuple(name for name in model.model_fields if name in requested)
+
+
+def projection(fields: Optional[Tuple[str, ...]], always: Iterable[str] = ()) -> Optional[Dict[str, int]]:
+    """Mongo projection for the fields; `always` adds keys needed server-side (e.g. sort keys)"""
+    if fields is None:
+        return None
+    proj = {"_id": 1}
+    for name in (*fields, *always):
+        if name != "id":
+            proj[name] = 1
+    return proj
+
+
+def build_row(doc: Dict[str, Any], spec: RowSpec, fields: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+    if fields is None:
+        return {name: get(doc) for name, get in spec.items()}
+    return {name: spec[name](doc) for name in fields}
+
+
+@lru_cache(maxsize=256)
+def trimmed_encoder(model: Type[BaseModel], fields: Tuple[str, ...]) -> ModelEncoder:
+    """Encoder for a copy of `model` restricted to `fields`"""
+    trimmed = create_model(
+        f"{model.__name__}Fields",
+        **{name: (info.annotation, info) for name, info in model.model_fields.items() if name in fields},
+    )
+    return ModelEncoder(trimmed)
@@ -0,0 +1,103 @@
+"""
+FX Rates
+
+Exchange rates for converting expense totals, loaded from a local JSON
+file (FX_RATES_FILE, default fx_rates.json next to this module); nothing
+is fetched over the network. The file is versioned:
+
+    {"version": "2026-10-01", "base": "USD", "rates": {"USD": 1.0, "EUR": 1.08}}
+
+where each rate is the value of one unit of that currency in `base`.
+
+The table is parsed once and cached in memory. The file's mtime is checked
+at most every FX_RELOAD_SECONDS, so replacing the file (with a new
+version) takes effect without a restart. A file that fails to parse is
+logged and ignored, and the previously loaded table stays in use.
+Responses that use the table report its version, and it is part of their
+ETags.
+
+Conversion runs inside MongoDB: rate_expression() compiles the table into
+a $switch over the currency field, so reports multiply the whole
+amount/currency columns in the aggregation instead of looping over rows
+in Python.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger("uvicorn.error")
+
+FX_RATES_FILE = os.getenv("FX_RATES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fx_rates.json"))
+FX_RELOAD_SECONDS = float(os.getenv("FX_RELOAD_SECONDS", "60"))
+
+
+class FxTable:
+    def __init__(self, path: str, reload_seconds: float = 60.0):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self.version: Optional[str] = None
+        self.base: Optional[str] = None
+        self.rates: Dict[str, float] = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.errors = 0
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_seconds:
+            return
+        with self._lock:
+            if now - self._checked_at < self.reload_seconds:
+                return
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                return
+            if mtime == self._mtime:
+                return
+            # Remembered even if the file is bad, so it is reported once per change
+            self._mtime = mtime
+            try:
+                with open(self.path) as f:
+                    table = json.load(f)
+                rates = {code: float(rate) for code, rate in table["rates"].items()}
+                version = str(table["version"])
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                logger.warning("Ignoring invalid FX rates file %s (keeping version %s): %r", self.path, self.version, e)
+                self.errors += 1
+                return
+            self.rates, self.version, self.base = rates, version, table.get("base")
+            self.loads += 1
+
+    def rates_to(self, currency: str) -> Dict[str, float]:
+        """Multiplier from every known currency into `currency`; raises 400/503"""
+        self._refresh()
+        if not self.rates:
+            raise HTTPException(status_code=503, detail="No FX rates loaded")
+        target = self.rates.get(currency)
+        if not target:
+            raise HTTPException(status_code=400, detail=f"No FX rate for {currency}")
+        return {code: rate / target for code, rate in self.rates.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"version": self.version, "base": self.base, "currencies": len(self.rates), "loads": self.loads, "errors": self.errors}
+
+
+def rate_expression(rates: Dict[str, float], field: str = "$currency") -> Dict[str, Any]:
+    """Aggregation expression for the rate of each document's currency (null when unknown)"""
+    return {"$switch": {
+        "branches": [{"case": {"$eq": [field, code]}, "then": rate} for code, rate in rates.items()],
+        "default": None,
+    }}
+
+
+fx_rates = FxTable(FX_RATES_FILE, FX_RELOAD_SECONDS)
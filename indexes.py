@@ -0,0 +1,118 @@
+"""
+Index Bootstrapper
+
+Declares the indexes every query in main.py relies on and creates them
+idempotently at startup. create_index is a no-op when an index with the
+same name and spec already exists, so this is safe to run on every boot
+and from every worker.
+
+ensure_indexes() also reports declared indexes that are missing and
+existing indexes that are undeclared or have never been used (from
+$indexStats), so drift shows up in the startup log.
+"""
+
+import logging
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import ConnectionFailure, OperationFailure, PyMongoError
+
+logger = logging.getLogger("uvicorn.error")
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "session": [
+        IndexModel([("token", ASCENDING)], name="token_unique", unique=True,
+                   partialFilterExpression={"token": {"$exists": True}}),
+        IndexModel([("jti", ASCENDING)], name="jti_unique", unique=True,
+                   partialFilterExpression={"jti": {"$exists": True}}),
+        IndexModel([("revoked", ASCENDING), ("expires_at", ASCENDING)], name="revoked_expires_at",
+                   partialFilterExpression={"revoked": True}),
+        # TTL: the server deletes sessions and revocations once expires_at passes
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "user": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "project": [
+        # Keyset pagination: sort and cursor on (created_at, _id)
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_id_desc"),
+    ],
+    "expense": [
+        # GET /expenses filters: equality field first, then the keyset sort
+        # keys, so each filter + date range + pagination is one index range scan
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_id_desc"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="status_created_at_id"),
+        IndexModel([("project_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="project_id_created_at_id"),
+        IndexModel([("requested_by", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="requested_by_created_at_id"),
+        IndexModel([("currency", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="currency_created_at_id"),
+    ],
+    "document": [
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+        IndexModel([("project_id", ASCENDING), ("created_at", DESCENDING)], name="project_id_created_at"),
+    ],
+}
+
+
+def _index_usage(collection) -> Dict[str, int]:
+    try:
+        return {s["name"]: int(s["accesses"]["ops"]) for s in collection.aggregate([{"$indexStats": {}}])}
+    except (OperationFailure, KeyError):
+        # $indexStats needs the clusterMonitor role on some deployments
+        return {}
+
+
+def ensure_indexes(db) -> Dict[str, Any]:
+    """Create all declared indexes and return a per-collection report.
+
+    Never raises: an unreachable server ends the bootstrap with a warning
+    so the app still starts, and indexes are retried on the next boot.
+    """
+    report: Dict[str, Any] = {}
+    for collection_name, models in INDEXES.items():
+        collection = db[collection_name]
+        declared = {m.document["name"] for m in models}
+        errors = []
+        try:
+            try:
+                collection.create_indexes(models)
+            except ConnectionFailure:
+                raise
+            except PyMongoError as e:
+                # One conflicting index (e.g. duplicates blocking a unique index)
+                # must not stop the rest from being built
+                errors.append(str(e)[:200])
+                for model in models:
+                    try:
+                        collection.create_indexes([model])
+                    except ConnectionFailure:
+                        raise
+                    except PyMongoError as e:
+                        errors.append(f"{model.document['name']}: {str(e)[:200]}")
+        except ConnectionFailure as e:
+            logger.warning("Skipping index bootstrap, MongoDB is unreachable: %s", e)
+            report[collection_name] = {"errors": [str(e)[:200]]}
+            return report
+
+        try:
+            existing = set(collection.index_information()) - {"_id_"}
+            usage = _index_usage(collection)
+        except PyMongoError as e:
+            logger.warning("Could not list indexes on %s: %s", collection_name, e)
+            report[collection_name] = {"errors": errors + [str(e)[:200]]}
+            continue
+        entry = {
+            "missing": sorted(declared - existing),
+            "undeclared": sorted(existing - declared),
+            "unused": sorted(name for name in existing if usage.get(name) == 0),
+        }
+        if errors:
+            entry["errors"] = errors
+        report[collection_name] = entry
+
+        if entry["missing"] or errors:
+            logger.warning("Indexes missing on %s: %s %s", collection_name, entry["missing"], errors)
+        if entry["undeclared"]:
+            logger.info("Undeclared indexes on %s: %s", collection_name, entry["undeclared"])
+        if entry["unused"]:
+            logger.info("Unused indexes on %s: %s", collection_name, entry["unused"])
+    return report
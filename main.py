@@ -1,15 +1,70 @@
 import os
-from fastapi import FastAPI, HTTPException, Depends, Header
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone
 from uuid import uuid4
+from pymongo.errors import DuplicateKeyError, ExecutionTimeout, PyMongoError
 
 # Database helpers
-from database import db, create_document, get_documents
-
-app = FastAPI(title="InTrack API", version="0.1.0")
+from database import get_db, create_document, get_documents, blocking_executor, run_blocking
+from database import close_client, pool_listener
+from database_async import get_adb
+from database_async import close_client as close_async_client, pool_listener as async_pool_listener
+from session_cache import session_cache
+from indexes import ensure_indexes
+from pagination import DEFAULT_PAGE_SIZE, KEYSET_SORT, MAX_PAGE_SIZE, encode_cursor, with_keyset
+from streaming import stream_cursor
+from serialization import ModelEncoder, dumps, is_fast_route, json_response
+from fields import RowSpec, build_row, parse_fields, projection, trimmed_encoder
+from versions import collection_key, document_key, etag_matches, project_key, versions
+from response_cache import response_cache
+from singleflight import single_flight
+from sequences import project_numbers
+from sessions import SESSION_REAP_INTERVAL_SECONDS, is_expired, reap_sessions, session_expiry, session_touches
+from workflow import WORKFLOWS
+import budgets
+from summaries import get_summary, record_created, record_transitions
+from fx import fx_rates
+from reports import REPORT_MAX_TIME_MS, check_group_count, parse_group_by, rollup_pipeline
+from tokens import TOKEN_MODE, check_token_config, is_signed_token, revocations, sign_token, verify_token
+
+logger = logging.getLogger("uvicorn.error")
+
+
+async def _session_reaper():
+    while True:
+        await asyncio.sleep(SESSION_REAP_INTERVAL_SECONDS)
+        try:
+            await run_blocking("session", reap_sessions, get_db(), datetime.now(timezone.utc))
+        except PyMongoError as e:
+            logger.warning("Session reaper failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.index_report = {}
+    reaper = None
+    check_token_config()
+    # Clients are created here, inside each worker process, never in a pre-fork parent
+    db = get_db()
+    get_adb()
+    if db is not None:
+        if os.getenv("INDEX_BOOTSTRAP", "1") != "0":
+            app.state.index_report = await run_blocking("indexes", ensure_indexes, db)
+        reaper = asyncio.create_task(_session_reaper())
+    yield
+    if reaper is not None:
+        reaper.cancel()
+    close_async_client()
+    close_client()
+
+
+app = FastAPI(title="InTrack API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,6 +72,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-FX-Version"],
 )
 
 # ----------------------
@@ -43,29 +99,130 @@ ALLOWED_ROLES = {"Admin", "Manager", "Engineer", "Accountant"}
 
 
 def _collection(name: str):
-    return db[name]
+    return get_db()[name]
+
+
+def _acollection(name: str):
+    """Motor collection for use inside `async def` endpoints"""
+    return get_adb()[name]
 
 
 def _now():
     return datetime.now(timezone.utc)
 
 
-async def get_current_user(authorization: Optional[str] = Header(default=None)) -> Dict[str, Any]:
-    if not authorization or not authorization.lower().startswith("bearer "):
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    token = authorization.split(" ", 1)[1]
-    session = _collection("session").find_one({"token": token})
+# "find" resolves token -> session -> user with two find_one calls,
+# "lookup" does it in a single aggregation round trip.
+SESSION_RESOLVER = os.getenv("AUTH_SESSION_RESOLVER", "find")
+
+
+# Both resolvers return (session, user); the session carries only
+# expires_at/last_seen for the sliding expiration check.
+
+def _check_session(session: Optional[Dict[str, Any]]) -> None:
     if not session:
         raise HTTPException(status_code=401, detail="Invalid session")
-    user = _collection("user").find_one({"_id": session["user_id"]})
+    if is_expired(session, _now()):
+        raise HTTPException(status_code=401, detail="Session expired")
+
+
+async def _resolve_user_find(token: str):
+    session = await _acollection("session").find_one({"token": token}, {"user_id": 1, "expires_at": 1, "last_seen": 1})
+    _check_session(session)
+    user = await _acollection("user").find_one({"_id": session["user_id"]})
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    return session, user
+
+
+async def _resolve_user_lookup(token: str):
+    pipeline = [
+        {"$match": {"token": token}},
+        {"$limit": 1},
+        {"$lookup": {"from": "user", "localField": "user_id", "foreignField": "_id", "as": "user"}},
+        {"$project": {
+            "_id": 0, "expires_at": 1, "last_seen": 1,
+            "user._id": 1, "user.name": 1, "user.email": 1, "user.role": 1,
+        }},
+    ]
+    rows = await _acollection("session").aggregate(pipeline).to_list(length=1)
+    session = rows[0] if rows else None
+    _check_session(session)
+    users = session.get("user") or []
+    if not users:
+        raise HTTPException(status_code=401, detail="User not found")
+    return session, users[0]
+
+
+SESSION_RESOLVERS = {
+    "find": _resolve_user_find,
+    "lookup": _resolve_user_lookup,
+}
+
+
+_revocations_refresh = asyncio.Lock()
+
+
+async def _refresh_revocations() -> None:
+    # One refresh per worker at a time; requests that waited find the filter fresh
+    async with _revocations_refresh:
+        if not revocations.needs_refresh():
+            return
+        cursor = _acollection("session").find({"revoked": True, "expires_at": {"$gt": _now()}}, {"jti": 1})
+        revocations.refresh([d["jti"] async for d in cursor])
+
+
+async def _is_revoked(jti: str) -> bool:
+    return await _acollection("session").find_one({"jti": jti, "revoked": True}, {"_id": 1}) is not None
+
+
+async def _resolve_signed_token(token: str) -> Dict[str, Any]:
+    claims = verify_token(token)
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if revocations.needs_refresh():
+        await _refresh_revocations()
+    if await revocations.is_revoked(claims["jti"], _is_revoked):
+        raise HTTPException(status_code=401, detail="Token revoked")
     return {
+        "_id": claims["sub"],
+        "name": claims.get("name"),
+        "email": claims.get("email"),
+        "role": claims.get("role"),
+    }
+
+
+async def _touch_session(token: str, last_seen: Optional[datetime] = None) -> None:
+    """Slide the session expiry forward, at most once per touch interval"""
+    if not session_touches.should_touch(token, last_seen):
+        return
+    now = _now()
+    await _acollection("session").update_one(
+        {"token": token},
+        {"$set": {"last_seen": now, "expires_at": session_expiry(now)}},
+    )
+
+
+async def get_current_user(authorization: Optional[str] = Header(default=None)) -> Dict[str, Any]:
+    if not authorization or not authorization.lower().startswith("bearer "):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    token = authorization.split(" ", 1)[1]
+    if TOKEN_MODE == "signed" and is_signed_token(token):
+        return await _resolve_signed_token(token)
+    cached = session_cache.get(token)
+    if cached is not None:
+        await _touch_session(token)
+        return cached
+    session, user = await SESSION_RESOLVERS.get(SESSION_RESOLVER, _resolve_user_find)(token)
+    await _touch_session(token, session.get("last_seen"))
+    current = {
         "_id": str(user["_id"]),
         "name": user.get("name"),
         "email": user.get("email"),
         "role": user.get("role"),
     }
+    session_cache.set(token, current)
+    return current
 
 
 def require_roles(*roles: str):
@@ -92,6 +249,7 @@ def test_database():
         "collections": []
     }
     try:
+        db = get_db()
         if db is not None:
             response["database"] = "✅ Connected"
             response["connection_status"] = "Connected"
@@ -122,7 +280,11 @@ def register(body: RegisterBody):
         "updated_at": _now(),
         "status": "active",
     }
-    inserted_id = _collection("user").insert_one(data).inserted_id
+    try:
+        inserted_id = _collection("user").insert_one(data).inserted_id
+    except DuplicateKeyError:
+        # Lost a race with a concurrent registration (user.email is unique)
+        raise HTTPException(status_code=409, detail="Email already registered")
     return {"id": str(inserted_id), "name": body.name, "email": body.email, "role": body.role}
 
 
@@ -131,12 +293,18 @@ def login(body: LoginBody):
     user = _collection("user").find_one({"email": body.email})
     if not user or user.get("password") != body.password:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    token = str(uuid4())
-    _collection("session").insert_one({
-        "token": token,
-        "user_id": user["_id"],
-        "created_at": _now(),
-    })
+    if TOKEN_MODE == "signed":
+        token = sign_token(user)["token"]
+    else:
+        token = str(uuid4())
+        now = _now()
+        _collection("session").insert_one({
+            "token": token,
+            "user_id": user["_id"],
+            "created_at": now,
+            "last_seen": now,
+            "expires_at": session_expiry(now),
+        })
     return {"token": token, "user": {"id": str(user["_id"]), "name": user.get("name"), "email": user.get("email"), "role": user.get("role")}}
 
 
@@ -150,10 +318,47 @@ async def logout(authorization: Optional[str] = Header(default=None)):
     if not authorization or not authorization.lower().startswith("bearer "):
         return {"ok": True}
     token = authorization.split(" ", 1)[1]
-    _collection("session").delete_one({"token": token})
+    if TOKEN_MODE == "signed" and is_signed_token(token):
+        claims = verify_token(token)
+        if claims:
+            # Signed tokens cannot be deleted; record the revocation instead.
+            # Upserted on jti (unique), so logging out twice is a no-op.
+            await _acollection("session").update_one(
+                {"jti": claims["jti"]},
+                {"$setOnInsert": {
+                    "user_id": claims["sub"],
+                    "revoked": True,
+                    "created_at": _now(),
+                    "expires_at": datetime.fromtimestamp(claims["exp"], tz=timezone.utc),
+                }},
+                upsert=True,
+            )
+            revocations.add(claims["jti"])
+        return {"ok": True}
+    await _acollection("session").delete_one({"token": token})
+    session_cache.invalidate(token)
+    session_touches.forget(token)
     return {"ok": True}
 
 
+@app.get("/metrics")
+async def metrics(user = Depends(require_roles("Admin"))):
+    return {
+        "session_cache": session_cache.stats(),
+        "revocations": revocations.stats(),
+        "session_touches": session_touches.stats(),
+        "versions": versions.stats(),
+        "response_cache": response_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "project_numbers": project_numbers.stats(),
+        "workflows": {name: wf.stats() for name, wf in WORKFLOWS.items()},
+        "fx": fx_rates.stats(),
+        "db_executor": blocking_executor.stats(),
+        "db_pool": {"sync": pool_listener.stats(), "async": async_pool_listener.stats()},
+        "indexes": getattr(app.state, "index_report", {}),
+    }
+
+
 # ----------------------
 # Projects
 # ----------------------
@@ -163,71 +368,208 @@ class ProjectIn(BaseModel):
     status: str = Field(default="active")
     manager_id: Optional[str] = None
     engineer_ids: List[str] = []
+    budget: Optional[float] = Field(default=None, ge=0)
+    budget_currency: Optional[str] = Field(default=None, pattern=r"^[A-Z]{3}$")
 
 class ProjectOut(ProjectIn):
     id: str
     number: int
+    spent: float = 0
+    committed: float = 0
 
 
-def _next_project_number() -> int:
-    seq = _collection("counter").find_one_and_update(
-        {"_id": "project_number"},
-        {"$inc": {"value": 1}},
-        upsert=True,
-        return_document=True
-    )
-    return int(seq.get("value", 1))
+PROJECT_ROW: RowSpec = {
+    "id": lambda d: str(d["_id"]),
+    "number": lambda d: d.get("number", 0),
+    "title": lambda d: d.get("title", ""),
+    "client": lambda d: d.get("client", ""),
+    "status": lambda d: d.get("status", "active"),
+    "manager_id": lambda d: d.get("manager_id"),
+    "engineer_ids": lambda d: d.get("engineer_ids", []),
+    "budget": lambda d: d.get("budget"),
+    "budget_currency": lambda d: d.get("budget_currency"),
+    "spent": lambda d: d.get("spent", 0),
+    "committed": lambda d: d.get("committed", 0),
+}
+
+
+def _project_row(d: Dict[str, Any], fields: Optional[tuple] = None) -> Dict[str, Any]:
+    return build_row(d, PROJECT_ROW, fields)
+
+
+PROJECT_ENCODER = ModelEncoder(ProjectOut)
+
+# ?stream=ndjson|array streams every matching row (ignoring limit) for exports
+STREAM_QUERY = Query(None, pattern=r"^(ndjson|array)$")
+# ?fields=a,b projects documents and trims the response to those fields (id is always included)
+FIELDS_QUERY = Query(None, description="Comma separated response fields")
+
+
+def _encoder(model, default: ModelEncoder, fields: Optional[tuple]) -> ModelEncoder:
+    return default if fields is None else trimmed_encoder(model, fields)
+
+
+async def _bump_versions(*keys: str) -> None:
+    await versions.bump(get_adb(), *keys)
+    response_cache.invalidate(*keys)
+
+
+async def _check_etag(request: Request, keys: List[str], salt: str = "", wildcard: bool = True):
+    """Returns (etag, 304 response) when If-None-Match still matches, else (etag, None).
+
+    `salt` covers inputs other than the versioned collections (e.g. the FX table version).
+    Pass wildcard=False where the resource may not exist, so "*" cannot turn a 404 into a 304.
+    """
+    scope = request.url.path + "?" + request.url.query + salt
+    etag = await versions.etag(get_adb(), scope, keys)
+    if etag_matches(request.headers.get("if-none-match"), etag, wildcard):
+        versions.not_modified += 1
+        return etag, Response(status_code=304, headers={"ETag": etag})
+    return etag, None
+
+
+def _cache_lookup(route: str, request: Request, user: Dict[str, Any], etag: str):
+    """Returns (cache key, cached response); the key is None when the cache is disabled"""
+    if not response_cache.enabled:
+        return None, None
+    key = response_cache.key(route, request, user["role"])
+    hit = response_cache.get(key, etag)
+    return key, (json_response(hit.body, hit.headers) if hit else None)
+
+
+async def _fetch_page(found, limit: int, headers: Dict[str, str]):
+    # One extra row tells us whether another page exists
+    docs = await found.limit(limit + 1).to_list(length=limit + 1)
+    headers = dict(headers)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(docs[-1])
+    return docs, headers
+
+
+def _encoded_response(key: Optional[str], etag: str, tags: List[str], body: bytes, headers: Dict[str, str]) -> Response:
+    if key is not None:
+        response_cache.set(key, etag, tags, body, headers)
+    return json_response(body, headers)
+
+
+async def _next_project_number() -> int:
+    # Block-allocated per worker by default; PROJECT_NUMBER_MODE=gapless for strict sequences
+    return await project_numbers.next(get_adb())
 
 
 @app.post("/projects", response_model=ProjectOut)
 async def create_project(payload: ProjectIn, user=Depends(require_roles("Admin", "Manager"))):
-    number = _next_project_number()
+    if payload.budget is not None and payload.budget_currency is None:
+        raise HTTPException(status_code=400, detail="budget_currency is required with a budget")
+    number = await _next_project_number()
     doc = {
         "title": payload.title,
         "client": payload.client,
         "status": payload.status,
         "manager_id": payload.manager_id,
         "engineer_ids": payload.engineer_ids,
+        "budget": payload.budget,
+        "budget_currency": payload.budget_currency,
+        "spent": 0,
+        "committed": 0,
         "number": number,
         "created_by": user["_id"],
         "created_at": _now(),
         "updated_at": _now(),
     }
-    inserted_id = _collection("project").insert_one(doc).inserted_id
+    inserted_id = (await _acollection("project").insert_one(doc)).inserted_id
+    await _bump_versions(collection_key("project"), document_key("project", str(inserted_id)))
     return {"id": str(inserted_id), "number": number, **payload.model_dump()}
 
 
 @app.get("/projects", response_model=List[ProjectOut])
-async def list_projects(user = Depends(get_current_user)):
-    docs = _collection("project").find().sort("created_at", -1)
-    items: List[ProjectOut] = []  # type: ignore
-    for d in docs:
-        items.append(ProjectOut(
-            id=str(d["_id"]),
-            number=d.get("number", 0),
-            title=d.get("title", ""),
-            client=d.get("client", ""),
-            status=d.get("status", "active"),
-            manager_id=d.get("manager_id"),
-            engineer_ids=d.get("engineer_ids", []),
-        ))
-    return items
+async def list_projects(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: Optional[str] = STREAM_QUERY,
+    fields: Optional[str] = FIELDS_QUERY,
+    user = Depends(get_current_user),
+):
+    selected = parse_fields(fields, ProjectOut)
+    tags = [collection_key("project")]
+    etag, not_modified = await _check_etag(request, tags)
+    if not_modified:
+        return not_modified
+    headers: Dict[str, str] = {"ETag": etag}
+    found = _acollection("project").find(with_keyset({}, cursor), projection(selected, always=("created_at",))).sort(KEYSET_SORT)
+    if stream:
+        return stream_cursor(found, lambda d: _project_row(d, selected), stream, headers)
+    cache_key, cached = _cache_lookup("list_projects", request, user, etag)
+    if cached:
+        return cached
+    if cache_key or selected or is_fast_route("list_projects") or single_flight.covers("list_projects"):
+        async def load():
+            docs, page_headers = await _fetch_page(found, limit, headers)
+            body = _encoder(ProjectOut, PROJECT_ENCODER, selected).encode_many(_project_row(d, selected) for d in docs)
+            return body, page_headers
+
+        # Concurrent identical reads at the same versions share one query and one encoded body
+        body, headers = await single_flight.run("list_projects", etag + request.url.query, load)
+        return _encoded_response(cache_key, etag, tags, body, headers)
+    docs, headers = await _fetch_page(found, limit, headers)
+    response.headers.update(headers)
+    return [ProjectOut(**_project_row(d)) for d in docs]
 
 
 @app.get("/projects/{project_id}", response_model=ProjectOut)
-async def get_project(project_id: str, user = Depends(get_current_user)):
+async def get_project(
+    project_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = FIELDS_QUERY,
+    user = Depends(get_current_user),
+):
     from bson import ObjectId
-    d = _collection("project").find_one({"_id": ObjectId(project_id)})
+    selected = parse_fields(fields, ProjectOut)
+    tags = [document_key("project", project_id)]
+    etag, not_modified = await _check_etag(request, tags, wildcard=False)
+    if not_modified:
+        return not_modified
+    cache_key, cached = _cache_lookup("get_project", request, user, etag)
+    if cached:
+        return cached
+    d = await _acollection("project").find_one({"_id": ObjectId(project_id)}, projection(selected))
     if not d:
         raise HTTPException(status_code=404, detail="Not found")
-    return ProjectOut(
-        id=str(d["_id"]),
-        number=d.get("number", 0),
-        title=d.get("title", ""),
-        client=d.get("client", ""),
-        status=d.get("status", "active"),
-        manager_id=d.get("manager_id"),
-        engineer_ids=d.get("engineer_ids", []),
+    if cache_key or selected or is_fast_route("get_project"):
+        body = _encoder(ProjectOut, PROJECT_ENCODER, selected).encode_one(_project_row(d, selected))
+        return _encoded_response(cache_key, etag, tags, body, {"ETag": etag})
+    response.headers["ETag"] = etag
+    return ProjectOut(**_project_row(d))
+
+
+class BudgetOut(BaseModel):
+    project_id: str
+    budget: Optional[float] = None
+    budget_currency: Optional[str] = None
+    spent: float
+    committed: float
+    remaining: Optional[float] = None
+
+
+@app.get("/projects/{project_id}/budget", response_model=BudgetOut)
+async def get_project_budget(project_id: str, user = Depends(get_current_user)):
+    from bson import ObjectId
+    d = await _acollection("project").find_one(
+        {"_id": ObjectId(project_id)}, {"budget": 1, "budget_currency": 1, "spent": 1, "committed": 1}
+    )
+    if not d:
+        raise HTTPException(status_code=404, detail="Not found")
+    return BudgetOut(
+        project_id=project_id,
+        budget=d.get("budget"),
+        budget_currency=d.get("budget_currency"),
+        spent=d.get("spent", 0),
+        committed=d.get("committed", 0),
+        remaining=budgets.remaining(d),
     )
 
 
@@ -236,28 +578,65 @@ async def get_project(project_id: str, user = Depends(get_current_user)):
 # ----------------------
 class ExpenseIn(BaseModel):
     project_id: str
-    amount: float
+    amount: float = Field(gt=0)
     currency: str = Field(pattern=r"^[A-Z]{3}$")
     description: Optional[str] = None
 
 class ExpenseOut(ExpenseIn):
+    # Only new expenses must be positive; stored ones may predate the check
+    amount: float
     id: str
     status: str
     requested_by: str
     approvals: List[Dict[str, Any]]
 
 
+EXPENSE_ROW: RowSpec = {
+    "project_id": lambda exp: exp["project_id"],
+    "amount": lambda exp: float(exp["amount"]),
+    "currency": lambda exp: exp["currency"],
+    "description": lambda exp: exp.get("description"),
+    "id": lambda exp: str(exp["_id"]),
+    "status": lambda exp: exp["status"],
+    "requested_by": lambda exp: exp["requested_by"],
+    "approvals": lambda exp: exp.get("approvals", []),
+}
+
+
+def _expense_row(exp: Dict[str, Any], fields: Optional[tuple] = None) -> Dict[str, Any]:
+    return build_row(exp, EXPENSE_ROW, fields)
+
+
+EXPENSE_ENCODER = ModelEncoder(ExpenseOut)
+
+
 @app.post("/expenses", response_model=ExpenseOut)
 async def create_expense(payload: ExpenseIn, user = Depends(require_roles("Engineer", "Manager", "Admin"))):
     doc = {
         **payload.model_dump(),
-        "status": "pending_manager",
+        "status": WORKFLOWS["expense"].initial,
         "requested_by": user["_id"],
         "approvals": [],
         "created_at": _now(),
         "updated_at": _now(),
     }
-    inserted_id = _collection("expense").insert_one(doc).inserted_id
+    # Reserve against the project budget first, so over-budget expenses are never stored
+    doc["budget_reserved"] = await budgets.reserve(get_adb(), doc)
+    doc["summary_counted"] = True
+    try:
+        inserted_id = (await _acollection("expense").insert_one(doc)).inserted_id
+    except PyMongoError:
+        if doc["budget_reserved"]:
+            await budgets.release(get_adb(), doc)
+        raise
+    await record_created(get_adb(), doc)
+    # Project rows (list and detail) carry the budget counters
+    await _bump_versions(
+        collection_key("expense"),
+        project_key("expense", payload.project_id),
+        collection_key("project"),
+        document_key("project", payload.project_id),
+    )
     return ExpenseOut(id=str(inserted_id), approvals=[], status=doc["status"], requested_by=user["_id"], **payload.model_dump())
 
 
@@ -266,72 +645,239 @@ class ApproveBody(BaseModel):
     note: Optional[str] = None
 
 
+class BulkApproveBody(ApproveBody):
+    ids: List[str] = Field(min_length=1, max_length=MAX_PAGE_SIZE)
+
+
+class BulkApproveItem(BaseModel):
+    id: str
+    code: int
+    status: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class BulkApproveOut(BaseModel):
+    applied: int
+    results: List[BulkApproveItem]
+
+
 @app.post("/expenses/{expense_id}/approve", response_model=ExpenseOut)
 async def approve_expense(expense_id: str, body: ApproveBody, user = Depends(get_current_user)):
     from bson import ObjectId
-    exp = _collection("expense").find_one({"_id": ObjectId(expense_id)})
-    if not exp:
-        raise HTTPException(status_code=404, detail="Expense not found")
-
-    role = user["role"]
-    status = exp.get("status")
-
-    # Approval flow: Engineer -> Manager -> Accountant
-    if status == "pending_manager" and role not in {"Manager", "Admin"}:
-        raise HTTPException(status_code=403, detail="Manager approval required")
-    if status == "pending_accountant" and role not in {"Accountant", "Admin"}:
-        raise HTTPException(status_code=403, detail="Accountant approval required")
-
-    new_status = status
-    if body.action == "reject":
-        new_status = "rejected"
-    else:
-        if status == "pending_manager":
-            new_status = "pending_accountant"
-        elif status == "pending_accountant":
-            new_status = "approved"
-
     approval_entry = {
         "by": user["_id"],
-        "role": role,
+        "role": user["role"],
         "action": body.action,
         "note": body.note,
         "at": _now(),
     }
-
-    _collection("expense").update_one(
-        {"_id": ObjectId(expense_id)},
-        {"$set": {"status": new_status, "updated_at": _now()}, "$push": {"approvals": approval_entry}}
+    exp, previous = await WORKFLOWS["expense"].apply(
+        _acollection("expense"), ObjectId(expense_id), user["role"], body.action,
+        extra={"$push": {"approvals": approval_entry}},
     )
+    transitions = [(exp, previous, exp["status"])]
+    await record_transitions(get_adb(), transitions)
+    await budgets.record_transitions(get_adb(), transitions)
+    await _bump_versions(
+        collection_key("expense"),
+        project_key("expense", exp["project_id"]),
+        collection_key("project"),
+        document_key("project", exp["project_id"]),
+    )
+    return ExpenseOut(**_expense_row(exp))
+
 
-    exp = _collection("expense").find_one({"_id": ObjectId(expense_id)})
-    return ExpenseOut(
-        id=str(exp["_id"]),
-        project_id=exp["project_id"],
-        amount=float(exp["amount"]),
-        currency=exp["currency"],
-        description=exp.get("description"),
-        status=exp["status"],
-        requested_by=exp["requested_by"],
-        approvals=exp.get("approvals", []),
+@app.post("/expenses/approve", response_model=BulkApproveOut)
+async def approve_expenses(body: BulkApproveBody, user = Depends(get_current_user)):
+    """Approve or reject many expenses: one read to check them, one bulk_write to apply"""
+    from bson import ObjectId
+    ids = list(dict.fromkeys(body.ids))
+    invalid = [i for i in ids if not ObjectId.is_valid(i)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid expense id(s): {', '.join(invalid[:5])}")
+    # The batch id in the approval entry identifies which updates this request applied
+    batch = uuid4().hex
+    approval_entry = {
+        "by": user["_id"],
+        "role": user["role"],
+        "action": body.action,
+        "note": body.note,
+        "at": _now(),
+        "batch": batch,
+    }
+    results, applied = await WORKFLOWS["expense"].apply_many(
+        _acollection("expense"), [ObjectId(i) for i in ids], user["role"], body.action,
+        marker={"approvals.batch": batch},
+        extra={"$push": {"approvals": approval_entry}},
+        fields=("project_id", "amount", "currency", "budget_reserved", "summary_counted"),
     )
+    if applied:
+        transitions = [(exp, exp["status"], new) for exp, new in applied]
+        await record_transitions(get_adb(), transitions)
+        await budgets.record_transitions(get_adb(), transitions)
+        project_ids = {exp["project_id"] for exp, _ in applied}
+        await _bump_versions(
+            collection_key("expense"),
+            *(project_key("expense", pid) for pid in project_ids),
+            collection_key("project"),
+            *(document_key("project", pid) for pid in project_ids),
+        )
+    return BulkApproveOut(applied=len(applied), results=results)
+
+
+def _expense_filter(
+    status: Optional[str] = Query(None, pattern=r"^(pending_manager|pending_accountant|approved|rejected)$"),
+    project_id: Optional[str] = None,
+    requested_by: Optional[str] = None,
+    currency: Optional[str] = Query(None, pattern=r"^[A-Z]{3}$"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Mongo filter from the expense query parameters shared by lists and reports"""
+    # Each equality filter has a (field, created_at, _id) index, see indexes.py
+    query: Dict[str, Any] = {}
+    if status:
+        query["status"] = status
+    if project_id:
+        query["project_id"] = project_id
+    if requested_by:
+        query["requested_by"] = requested_by
+    if currency:
+        query["currency"] = currency
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = created_from
+        if created_to:
+            query["created_at"]["$lt"] = created_to
+    return query
+
+
+def _expense_scope(query: Dict[str, Any]) -> str:
+    """Version key covering every expense the filter can match"""
+    project_id = query.get("project_id")
+    return project_key("expense", project_id) if project_id else collection_key("expense")
 
 
 @app.get("/expenses", response_model=List[ExpenseOut])
-async def list_expenses(user = Depends(get_current_user)):
-    items: List[ExpenseOut] = []  # type: ignore
-    for exp in _collection("expense").find().sort("created_at", -1):
-        items.append(ExpenseOut(
-            id=str(exp["_id"]),
-            project_id=exp["project_id"],
-            amount=float(exp["amount"]),
-            currency=exp["currency"],
-            description=exp.get("description"),
-            status=exp["status"],
-            requested_by=exp["requested_by"],
-            approvals=exp.get("approvals", []),
-        ))
-    return items
+async def list_expenses(
+    request: Request,
+    response: Response,
+    query: Dict[str, Any] = Depends(_expense_filter),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: Optional[str] = STREAM_QUERY,
+    fields: Optional[str] = FIELDS_QUERY,
+    user = Depends(get_current_user),
+):
+    selected = parse_fields(fields, ExpenseOut)
+    etag, not_modified = await _check_etag(request, [_expense_scope(query)])
+    if not_modified:
+        return not_modified
+    headers: Dict[str, str] = {"ETag": etag}
+    found = _acollection("expense").find(with_keyset(query, cursor), projection(selected, always=("created_at",))).sort(KEYSET_SORT)
+    if stream:
+        return stream_cursor(found, lambda exp: _expense_row(exp, selected), stream, headers)
+    if selected or is_fast_route("list_expenses") or single_flight.covers("list_expenses"):
+        async def load():
+            docs, page_headers = await _fetch_page(found, limit, headers)
+            body = _encoder(ExpenseOut, EXPENSE_ENCODER, selected).encode_many(_expense_row(exp, selected) for exp in docs)
+            return body, page_headers
+
+        body, headers = await single_flight.run("list_expenses", etag + request.url.query, load)
+        return json_response(body, headers)
+    docs, headers = await _fetch_page(found, limit, headers)
+    response.headers.update(headers)
+    return [ExpenseOut(**_expense_row(exp)) for exp in docs]
+
+
+class ExpenseRollupRow(BaseModel):
+    project: Optional[str] = None
+    status: Optional[str] = None
+    requester: Optional[str] = None
+    month: Optional[str] = None
+    currency: Optional[str] = None
+    total: float
+    count: int
+    converted_to: Optional[str] = None
+    unconverted: Optional[int] = None
+
+
+@app.get("/reports/expenses", response_model=List[ExpenseRollupRow])
+async def expense_report(
+    request: Request,
+    query: Dict[str, Any] = Depends(_expense_filter),
+    group_by: Optional[str] = Query(None, description="Comma separated: project,currency,status,requester,month"),
+    convert_to: Optional[str] = Query(None, pattern=r"^[A-Z]{3}$"),
+    user = Depends(require_roles("Manager", "Accountant", "Admin")),
+):
+    dimensions = parse_group_by(group_by, converted=bool(convert_to))
+    rates = fx_rates.rates_to(convert_to) if convert_to else None
+    headers: Dict[str, str] = {"X-FX-Version": fx_rates.version} if convert_to else {}
+    tags = [_expense_scope(query)]
+    etag, not_modified = await _check_etag(request, tags, salt=headers.get("X-FX-Version", ""))
+    if not_modified:
+        return not_modified
+    cache_key, cached = _cache_lookup("expense_report", request, user, etag)
+    if cached:
+        return cached
+    try:
+        rows = await _acollection("expense").aggregate(
+            rollup_pipeline(query, dimensions, convert_to, rates), maxTimeMS=REPORT_MAX_TIME_MS
+        ).to_list(length=None)
+    except ExecutionTimeout:
+        raise HTTPException(status_code=503, detail="Report timed out, narrow the filters")
+    check_group_count(rows)
+    return _encoded_response(cache_key, etag, tags, dumps(rows), {"ETag": etag, **headers})
+
+
+class SummaryCell(BaseModel):
+    count: int
+    total: float
+
+
+class ExpenseSummaryOut(BaseModel):
+    project_id: str
+    count: int
+    by_status: Dict[str, Dict[str, SummaryCell]]
+    updated_at: Optional[datetime] = None
+    # With ?convert_to=: per-status totals in that currency
+    converted_to: Optional[str] = None
+    fx_version: Optional[str] = None
+    totals: Optional[Dict[str, float]] = None
+    unconverted: Optional[int] = None
+
+
+@app.get("/projects/{project_id}/expense-summary", response_model=ExpenseSummaryOut)
+async def project_expense_summary(
+    project_id: str,
+    convert_to: Optional[str] = Query(None, pattern=r"^[A-Z]{3}$"),
+    user = Depends(get_current_user),
+):
+    """Per-status, per-currency totals from the incrementally maintained read model"""
+    rates = fx_rates.rates_to(convert_to) if convert_to else None
+    summary = await get_summary(get_adb(), project_id) or {"count": 0}
+    # Cells emptied by transitions stay behind with count 0
+    by_status = {
+        status: {cur: cell for cur, cell in cells.items() if cell.get("count", 0) > 0}
+        for status, cells in summary.get("by_status", {}).items()
+        if any(cell.get("count", 0) > 0 for cell in cells.values())
+    }
+    out = ExpenseSummaryOut(
+        project_id=project_id,
+        count=summary["count"],
+        by_status=by_status,
+        updated_at=summary.get("updated_at"),
+    )
+    if rates is not None:
+        # One cell per status and currency, never per expense
+        out.converted_to, out.fx_version = convert_to, fx_rates.version
+        out.totals = {
+            status: sum(cell["total"] * rates[cur] for cur, cell in cells.items() if cur in rates)
+            for status, cells in by_status.items()
+        }
+        out.unconverted = sum(cell["count"] for cells in by_status.values() for cur, cell in cells.items() if cur not in rates)
+    return out
 
 
 # ----------------------
@@ -352,24 +898,19 @@ class LeaveOut(LeaveIn):
 async def request_leave(payload: LeaveIn, user = Depends(require_roles("Engineer", "Manager", "Admin", "Accountant"))):
     doc = {
         **payload.model_dump(),
-        "status": "pending_manager",
+        "status": WORKFLOWS["leave"].initial,
         "user_id": user["_id"],
         "created_at": _now(),
         "updated_at": _now(),
     }
-    inserted_id = _collection("leave").insert_one(doc).inserted_id
+    inserted_id = (await _acollection("leave").insert_one(doc)).inserted_id
     return LeaveOut(id=str(inserted_id), status=doc["status"], user_id=user["_id"], **payload.model_dump())
 
 
 @app.post("/leaves/{leave_id}/approve", response_model=LeaveOut)
-async def approve_leave(leave_id: str, body: ApproveBody, user = Depends(require_roles("Manager", "Admin"))):
+async def approve_leave(leave_id: str, body: ApproveBody, user = Depends(get_current_user)):
     from bson import ObjectId
-    leave = _collection("leave").find_one({"_id": ObjectId(leave_id)})
-    if not leave:
-        raise HTTPException(status_code=404, detail="Leave not found")
-    new_status = "approved" if body.action == "approve" else "rejected"
-    _collection("leave").update_one({"_id": ObjectId(leave_id)}, {"$set": {"status": new_status, "updated_at": _now()}})
-    leave = _collection("leave").find_one({"_id": ObjectId(leave_id)})
+    leave, _ = await WORKFLOWS["leave"].apply(_acollection("leave"), ObjectId(leave_id), user["role"], body.action)
     return LeaveOut(id=str(leave["_id"]), status=leave["status"], user_id=leave["user_id"], start_date=leave["start_date"], end_date=leave["end_date"], reason=leave.get("reason"))
 
 
@@ -387,6 +928,23 @@ class DocumentOut(DocumentIn):
     created_by: str
 
 
+DOCUMENT_ROW: RowSpec = {
+    "project_id": lambda d: d["project_id"],
+    "type": lambda d: d["type"],
+    "title": lambda d: d["title"],
+    "url": lambda d: d.get("url"),
+    "id": lambda d: str(d["_id"]),
+    "created_by": lambda d: d["created_by"],
+}
+
+
+def _document_row(d: Dict[str, Any], fields: Optional[tuple] = None) -> Dict[str, Any]:
+    return build_row(d, DOCUMENT_ROW, fields)
+
+
+DOCUMENT_ENCODER = ModelEncoder(DocumentOut)
+
+
 @app.post("/documents", response_model=DocumentOut)
 async def create_document(payload: DocumentIn, user = Depends(require_roles("Engineer", "Manager", "Admin"))):
     doc = {
@@ -395,26 +953,42 @@ async def create_document(payload: DocumentIn, user = Depends(require_roles("Eng
         "created_at": _now(),
         "updated_at": _now(),
     }
-    inserted_id = _collection("document").insert_one(doc).inserted_id
+    inserted_id = (await _acollection("document").insert_one(doc)).inserted_id
+    await _bump_versions(collection_key("document"), project_key("document", payload.project_id))
     return DocumentOut(id=str(inserted_id), created_by=user["_id"], **payload.model_dump())
 
 
 @app.get("/documents", response_model=List[DocumentOut])
-async def list_documents(project_id: Optional[str] = None, user = Depends(get_current_user)):
+async def list_documents(
+    request: Request,
+    response: Response,
+    project_id: Optional[str] = None,
+    stream: Optional[str] = STREAM_QUERY,
+    fields: Optional[str] = FIELDS_QUERY,
+    user = Depends(get_current_user),
+):
+    selected = parse_fields(fields, DocumentOut)
     query: Dict[str, Any] = {}
     if project_id:
         query["project_id"] = project_id
-    items: List[DocumentOut] = []  # type: ignore
-    for d in _collection("document").find(query).sort("created_at", -1):
-        items.append(DocumentOut(
-            id=str(d["_id"]),
-            project_id=d["project_id"],
-            type=d["type"],
-            title=d["title"],
-            url=d.get("url"),
-            created_by=d["created_by"],
-        ))
-    return items
+    tags = [project_key("document", project_id) if project_id else collection_key("document")]
+    etag, not_modified = await _check_etag(request, tags)
+    if not_modified:
+        return not_modified
+    headers: Dict[str, str] = {"ETag": etag}
+    found = _acollection("document").find(query, projection(selected)).sort("created_at", -1)
+    if stream:
+        return stream_cursor(found, lambda d: _document_row(d, selected), stream, headers)
+    # Only per-project document lists are cached; the unfiltered list is unbounded
+    cache_key, cached = _cache_lookup("list_documents", request, user, etag) if project_id else (None, None)
+    if cached:
+        return cached
+    rows = [_document_row(d, selected) async for d in found]
+    if cache_key or selected or is_fast_route("list_documents"):
+        body = _encoder(DocumentOut, DOCUMENT_ENCODER, selected).encode_many(rows)
+        return _encoded_response(cache_key, etag, tags, body, headers)
+    response.headers.update(headers)
+    return [DocumentOut(**row) for row in rows]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+"""
+Keyset Pagination
+
+Opaque cursors for lists sorted newest first by (created_at, _id). The
+cursor encodes the sort key of the last row of a page; the next page is
+everything strictly after it, which an index on the same keys serves
+without skipping over earlier rows.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+KEYSET_SORT = [("created_at", -1), ("_id", -1)]
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    payload = {"t": doc["created_at"].isoformat(), "id": str(doc["_id"])}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        return {"created_at": datetime.fromisoformat(payload["t"]), "_id": ObjectId(payload["id"])}
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(cursor: Optional[str]) -> Dict[str, Any]:
+    """Mongo filter selecting rows after the cursor in KEYSET_SORT order"""
+    if not cursor:
+        return {}
+    key = decode_cursor(cursor)
+    return {"$or": [
+        {"created_at": {"$lt": key["created_at"]}},
+        {"created_at": key["created_at"], "_id": {"$lt": key["_id"]}},
+    ]}
+
+
+def with_keyset(query: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+    """AND a keyset filter onto an existing query"""
+    after = keyset_filter(cursor)
+    if not after:
+        return query
+    if not query:
+        return after
+    return {"$and": [query, after]}
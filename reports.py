@@ -0,0 +1,88 @@
+"""
+Expense Rollups
+
+Server-side totals for GET /reports/expenses: a single aggregation that
+matches on the same indexed filters as GET /expenses, then $groups by the
+requested dimensions and sums amounts. Only one row per group crosses the
+wire.
+
+Amounts in different currencies are never added together: currency is
+part of the group key unless the report converts to one currency. Then
+each amount is multiplied by its rate (see fx.py) inside the $group, and
+rows without a known rate are counted as `unconverted`.
+
+Every aggregation runs with maxTimeMS = REPORT_MAX_TIME_MS, so an
+unselective report fails fast instead of tying up the server. A report
+with more than REPORT_MAX_GROUPS groups is refused with 400 rather than
+returned partially.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from fx import rate_expression
+
+REPORT_MAX_TIME_MS = int(os.getenv("REPORT_MAX_TIME_MS", "5000"))
+REPORT_MAX_GROUPS = int(os.getenv("REPORT_MAX_GROUPS", "1000"))
+
+# Report dimension -> group key expression over expense documents
+EXPENSE_GROUPS: Dict[str, Any] = {
+    "project": "$project_id",
+    "currency": "$currency",
+    "status": "$status",
+    "requester": "$requested_by",
+    "month": {"$dateToString": {"format": "%Y-%m", "date": "$created_at"}},
+}
+
+
+def parse_group_by(group_by: Optional[str], converted: bool = False, groups: Dict[str, Any] = EXPENSE_GROUPS) -> Tuple[str, ...]:
+    """Split ?group_by= into known dimensions; currency is included unless totals are converted"""
+    requested = [g.strip() for g in (group_by or "").split(",") if g.strip()]
+    unknown = [g for g in requested if g not in groups]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group(s): {', '.join(unknown)}")
+    return tuple(dict.fromkeys(requested if converted else requested + ["currency"]))
+
+
+def rollup_pipeline(
+    match: Dict[str, Any],
+    dimensions: Tuple[str, ...],
+    convert_to: Optional[str] = None,
+    rates: Optional[Dict[str, float]] = None,
+    groups: Dict[str, Any] = EXPENSE_GROUPS,
+) -> List[Dict[str, Any]]:
+    """$match -> $group -> flat rows of {dimension..., total, count}, sorted by dimension.
+
+    With convert_to, `rates` maps each currency to its multiplier into
+    convert_to and totals are summed in that currency.
+    """
+    group: Dict[str, Any] = {"_id": {d: groups[d] for d in dimensions}, "count": {"$sum": 1}}
+    output: Dict[str, Any] = {"_id": 0, **{d: f"$_id.{d}" for d in dimensions}, "total": 1, "count": 1}
+    pipeline: List[Dict[str, Any]] = [{"$match": match}]
+    if convert_to:
+        pipeline.append({"$set": {"_rate": rate_expression(rates or {})}})
+        # $multiply yields null for unknown currencies, which $sum skips
+        group["total"] = {"$sum": {"$multiply": ["$amount", "$_rate"]}}
+        group["unconverted"] = {"$sum": {"$cond": [{"$ifNull": ["$_rate", False]}, 0, 1]}}
+        output.update(unconverted=1, converted_to={"$literal": convert_to})
+    else:
+        group["total"] = {"$sum": "$amount"}
+    pipeline.append({"$group": group})
+    if dimensions:
+        # An empty $sort is rejected; ungrouped totals are a single row anyway
+        pipeline.append({"$sort": {f"_id.{d}": 1 for d in dimensions}})
+    return pipeline + [
+        # One extra group tells check_group_count the cap was exceeded
+        {"$limit": REPORT_MAX_GROUPS + 1},
+        {"$project": output},
+    ]
+
+
+def check_group_count(rows: List[Dict[str, Any]]) -> None:
+    if len(rows) > REPORT_MAX_GROUPS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Report exceeds {REPORT_MAX_GROUPS} groups, narrow the filters or group by fewer fields",
+        )
@@ -0,0 +1,76 @@
+"""
+Sequence Allocation
+
+Human-facing sequence numbers (e.g. project numbers) backed by a counter
+document holding the last number handed out.
+
+- "gapless": one `$inc: 1` round trip per number. Numbers are consecutive
+  in allocation order across all workers.
+- "hilo": each worker reserves a block of `block_size` numbers with a
+  single `$inc` and hands them out from memory. That cuts counter writes
+  and contention on the counter document by the block size. Numbers are
+  still unique, but a worker that exits leaves the rest of its block
+  unused, and numbers from different workers interleave.
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, Optional
+
+from pymongo import ReturnDocument
+
+COUNTER_COLLECTION = "counter"
+
+
+class SequenceAllocator:
+    def __init__(self, counter_id: str, mode: str = "hilo", block_size: int = 20):
+        if mode not in ("hilo", "gapless"):
+            raise ValueError(f"Unknown sequence mode: {mode}")
+        self.counter_id = counter_id
+        self.mode = mode
+        self.block_size = max(1, block_size) if mode == "hilo" else 1
+        self._next: Optional[int] = None
+        self._last: Optional[int] = None
+        self._lock = asyncio.Lock()
+        self.allocated = 0
+        self.reservations = 0
+
+    async def _reserve(self, db, size: int) -> int:
+        """Reserve `size` numbers; returns the last number of the block"""
+        seq = await db[COUNTER_COLLECTION].find_one_and_update(
+            {"_id": self.counter_id},
+            {"$inc": {"value": size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self.reservations += 1
+        return int(seq.get("value", size))
+
+    async def next(self, db) -> int:
+        if self.mode == "gapless":
+            self.allocated += 1
+            return await self._reserve(db, 1)
+        async with self._lock:
+            if self._next is None or self._next > self._last:
+                self._last = await self._reserve(db, self.block_size)
+                self._next = self._last - self.block_size + 1
+            number = self._next
+            self._next += 1
+            self.allocated += 1
+            return number
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "block_size": self.block_size,
+            "allocated": self.allocated,
+            "reservations": self.reservations,
+            "remaining_in_block": (self._last - self._next + 1) if self._next is not None else 0,
+        }
+
+
+project_numbers = SequenceAllocator(
+    "project_number",
+    mode=os.getenv("PROJECT_NUMBER_MODE", "hilo"),
+    block_size=int(os.getenv("PROJECT_NUMBER_BLOCK_SIZE", "20")),
+)
@@ -0,0 +1,74 @@
+"""
+Fast Serialization
+
+Response encoding that skips the dict -> model -> dict -> JSON round trip
+of returning Pydantic objects through `response_model`.
+
+Routes listed in FAST_JSON_ROUTES (comma separated handler names, or "*")
+return pre-encoded JSON bytes built straight from the row dicts. Encoding
+uses orjson when installed and pydantic-core's Rust encoder otherwise;
+both handle datetimes, and ObjectIds fall back to str().
+
+With FAST_JSON_VALIDATE=1 the rows are still checked once against the
+response model through a precompiled TypeAdapter, instead of twice.
+"""
+
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+import pydantic_core
+from bson import ObjectId
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+FAST_JSON_ROUTES = {r.strip() for r in os.getenv("FAST_JSON_ROUTES", "").split(",") if r.strip()}
+FAST_JSON_VALIDATE = os.getenv("FAST_JSON_VALIDATE", "0") == "1"
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Encode to compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return pydantic_core.to_json(value, fallback=_default)
+
+
+def is_fast_route(route: str) -> bool:
+    return "*" in FAST_JSON_ROUTES or route in FAST_JSON_ROUTES
+
+
+class ModelEncoder:
+    """Encodes row dicts shaped like `model`, with a TypeAdapter compiled once"""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.one = TypeAdapter(model)
+        self.many = TypeAdapter(List[model])
+
+    def encode_one(self, row: Dict[str, Any]) -> bytes:
+        if FAST_JSON_VALIDATE:
+            return self.one.dump_json(self.one.validate_python(row))
+        return dumps(row)
+
+    def encode_many(self, rows: Iterable[Dict[str, Any]]) -> bytes:
+        rows = list(rows)
+        if FAST_JSON_VALIDATE:
+            return self.many.dump_json(self.many.validate_python(rows))
+        return dumps(rows)
+
+
+def json_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
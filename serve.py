@@ -0,0 +1,62 @@
+"""
+Production Server
+
+Multi-worker entry point for the API, replacing `uvicorn --reload`:
+
+    python serve.py
+
+Workers default to the number of CPUs available to the process (override
+with WEB_CONCURRENCY). uvloop and httptools are used when installed.
+Each worker opens its own database clients in the app lifespan. On
+SIGTERM uvicorn stops accepting connections, lets in-flight requests
+finish for up to GRACEFUL_TIMEOUT seconds, runs the lifespan shutdown and
+exits.
+
+There is no max-requests recycling: uvicorn's multi-worker supervisor
+does not respawn workers that exit, so capped workers would stay down.
+"""
+
+import importlib.util
+import os
+
+import uvicorn
+
+
+def _available_cpus() -> int:
+    try:
+        # Respects container/cgroup CPU pinning, unlike os.cpu_count()
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _has(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _optional_int(name: str):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def main() -> None:
+    workers = int(os.getenv("WEB_CONCURRENCY") or _available_cpus())
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=workers,
+        loop="uvloop" if _has("uvloop") else "asyncio",
+        http="httptools" if _has("httptools") else "h11",
+        backlog=int(os.getenv("BACKLOG", "2048")),
+        timeout_keep_alive=int(os.getenv("KEEP_ALIVE", "5")),
+        limit_concurrency=_optional_int("LIMIT_CONCURRENCY"),
+        timeout_graceful_shutdown=int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        access_log=os.getenv("ACCESS_LOG", "0") == "1",
+    )
+
+
+if __name__ == "__main__":
+    main()
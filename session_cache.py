@@ -0,0 +1,113 @@
+"""
+Session Cache
+
+Bounded, TTL-evicting in-process cache mapping session tokens to the
+resolved user, so hot tokens skip the session/user lookups in
+get_current_user.
+
+The cache is per process. An explicit invalidation (logout, user update)
+only clears the local worker; other workers drop the entry once its TTL
+runs out, so keep SESSION_CACHE_TTL_SECONDS short.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+
+class SessionCache:
+    """LRU cache of token -> user dict with a per-entry time to live"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached user for token, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user = entry
+            if expires_at <= now:
+                self._remove(token)
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return dict(user)
+
+    def set(self, token: str, user: Dict[str, Any]) -> None:
+        """Cache user for token, evicting the least recently used entries"""
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (expires_at, dict(user))
+            self._tokens_by_user.setdefault(user["_id"], set()).add(token)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, token: str) -> None:
+        """Drop a single token (e.g. on logout)"""
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+                self.invalidations += 1
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop every cached token of a user (e.g. after a role or profile change)"""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, token: str) -> None:
+        # Caller holds the lock
+        _, user = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(user["_id"])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user["_id"]]
+
+
+session_cache = SessionCache(
+    max_entries=int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000")),
+    ttl_seconds=float(os.getenv("SESSION_CACHE_TTL_SECONDS", "60")),
+)
@@ -0,0 +1,100 @@
+"""
+Session Lifetimes
+
+Sessions expire after SESSION_TTL_SECONDS of inactivity. Every session
+document carries an `expires_at` that a TTL index (see indexes.py) uses to
+delete it server-side; each authenticated request slides the window
+forward by refreshing `last_seen` and `expires_at`.
+
+To avoid a write per request, refreshes are coalesced: a token is touched
+at most once per SESSION_TOUCH_INTERVAL_SECONDS per worker, and never when
+the stored `last_seen` shows another worker already touched it recently.
+"""
+
+import calendar
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+SESSION_TOUCH_INTERVAL_SECONDS = int(os.getenv("SESSION_TOUCH_INTERVAL_SECONDS", "300"))
+SESSION_REAP_INTERVAL_SECONDS = int(os.getenv("SESSION_REAP_INTERVAL_SECONDS", "600"))
+
+
+def session_expiry(now: datetime) -> datetime:
+    return now + timedelta(seconds=SESSION_TTL_SECONDS)
+
+
+def is_expired(session: Dict[str, Any], now: datetime) -> bool:
+    """True once expires_at has passed; the TTL monitor only runs every ~60s"""
+    expires_at = session.get("expires_at")
+    if expires_at is None:
+        return False
+    if expires_at.tzinfo is None:
+        # pymongo returns naive UTC datetimes unless tz_aware=True
+        expires_at = expires_at.replace(tzinfo=now.tzinfo)
+    return expires_at <= now
+
+
+class TouchCoalescer:
+    """Remembers when each token was last refreshed so writes happen at most once per interval"""
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.skipped = 0
+
+    def should_touch(self, token: str, last_seen: Optional[datetime] = None) -> bool:
+        """Return True when the caller should write last_seen for token now"""
+        now = time.time()
+        with self._lock:
+            previous = self._touched.get(token)
+            if previous is None and last_seen is not None:
+                # utctimetuple() treats pymongo's naive datetimes as UTC
+                previous = float(calendar.timegm(last_seen.utctimetuple()))
+                self._touched[token] = previous
+            if previous is not None and now - previous < self.interval_seconds:
+                self.skipped += 1
+                return False
+            self._touched[token] = now
+            self.writes += 1
+            return True
+
+    def forget(self, token: str) -> None:
+        with self._lock:
+            self._touched.pop(token, None)
+
+    def prune(self) -> int:
+        """Drop tokens not touched within the interval; returns how many were dropped"""
+        cutoff = time.time() - self.interval_seconds
+        with self._lock:
+            stale = [token for token, at in self._touched.items() if at < cutoff]
+            for token in stale:
+                del self._touched[token]
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"tracked": len(self._touched), "writes": self.writes, "skipped": self.skipped}
+
+
+session_touches = TouchCoalescer(SESSION_TOUCH_INTERVAL_SECONDS)
+
+
+def reap_sessions(db, now: datetime) -> int:
+    """Delete sessions created before expires_at existed, once they are past the TTL.
+
+    Sessions with expires_at are removed by the TTL index; this covers the
+    legacy documents the index cannot see.
+    """
+    result = db["session"].delete_many({
+        "token": {"$exists": True},
+        "expires_at": {"$exists": False},
+        "created_at": {"$lt": now - timedelta(seconds=SESSION_TTL_SECONDS)},
+    })
+    session_touches.prune()
+    return result.deleted_count
@@ -0,0 +1,54 @@
+"""
+Single-Flight Reads
+
+Collapses identical concurrent reads: the first request for a key starts
+the load, and every request for the same key that arrives before it
+finishes awaits that same result instead of issuing its own query.
+
+The load runs as its own task, so a disconnecting leader does not cancel
+it for the followers. Routes are enabled with SINGLE_FLIGHT_ROUTES (comma
+separated handler names, "*" for all, empty to disable).
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self, routes: str = "*"):
+        self.routes = {r.strip() for r in routes.split(",") if r.strip()}
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self.calls = 0
+        self.collapsed = 0
+
+    def covers(self, route: str) -> bool:
+        return "*" in self.routes or route in self.routes
+
+    async def run(self, route: str, key: str, load: Callable[[], Awaitable[T]]) -> T:
+        """Await load(), sharing it with concurrent callers using the same route and key"""
+        if not self.covers(route):
+            return await load()
+        flight_key = f"{route}|{key}"
+        self.calls += 1
+        task = self._inflight.get(flight_key)
+        if task is not None:
+            self.collapsed += 1
+        else:
+            task = asyncio.ensure_future(load())
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(flight_key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "routes": sorted(self.routes),
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "collapsed": self.collapsed,
+        }
+
+
+single_flight = SingleFlight(os.getenv("SINGLE_FLIGHT_ROUTES", "list_projects,list_expenses"))
@@ -0,0 +1,47 @@
+"""
+Streaming Responses
+
+Encodes a Mongo cursor row by row into an NDJSON or JSON-array body, so a
+large export never holds the full result (or a list of Pydantic models)
+in memory. The driver fetches STREAM_BATCH_SIZE documents per round trip.
+"""
+
+import os
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from fastapi.responses import StreamingResponse
+
+from serialization import dumps
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "array": "application/json",
+}
+
+
+async def _ndjson(cursor, to_row: Callable[[Dict[str, Any]], Dict[str, Any]]) -> AsyncIterator[bytes]:
+    async for doc in cursor:
+        yield dumps(to_row(doc)) + b"\n"
+
+
+async def _json_array(cursor, to_row: Callable[[Dict[str, Any]], Dict[str, Any]]) -> AsyncIterator[bytes]:
+    yield b"["
+    first = True
+    async for doc in cursor:
+        yield dumps(to_row(doc)) if first else b"," + dumps(to_row(doc))
+        first = False
+    yield b"]"
+
+
+def stream_cursor(
+    cursor,
+    to_row: Callable[[Dict[str, Any]], Dict[str, Any]],
+    fmt: str,
+    headers: Optional[Dict[str, str]] = None,
+) -> StreamingResponse:
+    """StreamingResponse over a Motor cursor in the given STREAM_FORMATS format"""
+    cursor = cursor.batch_size(STREAM_BATCH_SIZE)
+    body = _ndjson(cursor, to_row) if fmt == "ndjson" else _json_array(cursor, to_row)
+    return StreamingResponse(body, media_type=STREAM_FORMATS[fmt], headers=headers)
@@ -0,0 +1,143 @@
+"""
+Project Expense Summaries
+
+Read model in "project_expense_summary" with one document per project,
+keyed by project id:
+
+    {"_id": <project_id>, "count": n,
+     "by_status": {<status>: {<currency>: {"count": n, "total": amount}}},
+     "updated_at": ...}
+
+It is kept current with `$inc` upserts: create_expense adds to the
+initial status, and every approval transition moves the amount from the
+old status to the new one. A project dashboard is then a single _id
+point read instead of an aggregation.
+
+Counted expenses carry `summary_counted`, and transitions only move
+counted expenses, so expenses stored before this read model existed never
+drive a cell negative. They are missing from the summaries until
+`python summaries.py rebuild` has run once after rollout; the rebuild
+counts and marks every expense.
+
+The increments are separate writes from the expense updates, so a crash
+between the two can leave a summary slightly off. `python summaries.py
+rebuild` recomputes every summary from the expense collection in batches
+into a side collection, then swaps it in with one rename. Writes that land
+during a rebuild can be lost, so run it when expenses are quiet.
+"""
+
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from pymongo import UpdateOne
+
+SUMMARY_COLLECTION = "project_expense_summary"
+SUMMARY_REBUILD_BATCH_SIZE = int(os.getenv("SUMMARY_REBUILD_BATCH_SIZE", "500"))
+
+
+def _cell(status: str, currency: str) -> str:
+    return f"by_status.{status}.{currency}"
+
+
+async def record_created(adb, exp: Dict[str, Any]) -> None:
+    """Count a new expense under its initial status"""
+    cell = _cell(exp["status"], exp["currency"])
+    await adb[SUMMARY_COLLECTION].update_one(
+        {"_id": exp["project_id"]},
+        {
+            "$inc": {"count": 1, f"{cell}.count": 1, f"{cell}.total": exp["amount"]},
+            "$set": {"updated_at": datetime.now(timezone.utc)},
+        },
+        upsert=True,
+    )
+
+
+async def record_transitions(adb, transitions: Iterable[Tuple[Dict[str, Any], str, str]]) -> None:
+    """Move (expense, from status, to status) amounts between cells, one write per project"""
+    increments: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for exp, old, new in transitions:
+        if not exp.get("summary_counted"):
+            continue
+        inc = increments[exp["project_id"]]
+        for status, sign in ((old, -1), (new, 1)):
+            cell = _cell(status, exp["currency"])
+            inc[f"{cell}.count"] += sign
+            inc[f"{cell}.total"] += sign * exp["amount"]
+    if not increments:
+        return
+    now = datetime.now(timezone.utc)
+    await adb[SUMMARY_COLLECTION].bulk_write(
+        [
+            UpdateOne({"_id": project_id}, {"$inc": dict(inc), "$set": {"updated_at": now}}, upsert=True)
+            for project_id, inc in increments.items()
+        ],
+        ordered=False,
+    )
+
+
+async def get_summary(adb, project_id: str) -> Optional[Dict[str, Any]]:
+    return await adb[SUMMARY_COLLECTION].find_one({"_id": project_id})
+
+
+def rebuild_summaries(db, batch_size: int = SUMMARY_REBUILD_BATCH_SIZE) -> int:
+    """Recompute every summary from scratch; returns the number of projects"""
+    # Everything aggregated below is counted, so later transitions must move it
+    db["expense"].update_many({"summary_counted": {"$ne": True}}, {"$set": {"summary_counted": True}})
+    staging = db[SUMMARY_COLLECTION + "_rebuild"]
+    staging.drop()
+    groups = db["expense"].aggregate(
+        [
+            {"$group": {
+                "_id": {"project_id": "$project_id", "status": "$status", "currency": "$currency"},
+                "count": {"$sum": 1},
+                "total": {"$sum": "$amount"},
+            }},
+            {"$sort": {"_id.project_id": 1}},
+        ],
+        allowDiskUse=True,
+        batchSize=batch_size,
+    )
+    now = datetime.now(timezone.utc)
+    batch = []
+    current: Optional[Dict[str, Any]] = None
+    projects = 0
+    for group in groups:
+        key = group["_id"]
+        if current is None or current["_id"] != key["project_id"]:
+            if current is not None:
+                batch.append(current)
+            current = {"_id": key["project_id"], "count": 0, "by_status": {}, "updated_at": now}
+            projects += 1
+            if len(batch) >= batch_size:
+                staging.insert_many(batch)
+                batch = []
+        current["count"] += group["count"]
+        current["by_status"].setdefault(key["status"], {})[key["currency"]] = {
+            "count": group["count"],
+            "total": group["total"],
+        }
+    if current is not None:
+        batch.append(current)
+    if batch:
+        staging.insert_many(batch)
+
+    if projects:
+        staging.rename(SUMMARY_COLLECTION, dropTarget=True)
+    else:
+        db[SUMMARY_COLLECTION].drop()
+    return projects
+
+
+if __name__ == "__main__":
+    from database import get_db
+
+    if sys.argv[1:2] != ["rebuild"]:
+        sys.exit("usage: python summaries.py rebuild [batch_size]")
+    db = get_db()
+    if db is None:
+        sys.exit("DATABASE_URL and DATABASE_NAME must be set")
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else SUMMARY_REBUILD_BATCH_SIZE
+    print(f"Rebuilt {rebuild_summaries(db, size)} project expense summaries")
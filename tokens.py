@@ -0,0 +1,179 @@
+"""
+Signed Access Tokens
+
+Stateless alternative to the random session tokens stored in the
+"session" collection. A token carries the user id, name, email, role and
+expiry, signed with HMAC-SHA256, so get_current_user can verify it in CPU
+without touching the database.
+
+Logout still works: revoked token ids (jti) are written to the "session"
+collection and mirrored into an in-memory Bloom filter that each worker
+rebuilds every AUTH_REVOCATION_REFRESH_SECONDS. A filter hit is confirmed
+against the database, so false positives only cost a lookup.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+from uuid import uuid4
+
+TOKEN_MODE = os.getenv("AUTH_TOKEN_MODE", "session")
+TOKEN_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", str(12 * 3600)))
+TOKEN_PREFIX = "v1"
+
+
+def _secret() -> bytes:
+    secret = os.getenv("AUTH_TOKEN_SECRET")
+    if not secret:
+        raise RuntimeError("AUTH_TOKEN_SECRET must be set when AUTH_TOKEN_MODE=signed")
+    return secret.encode()
+
+
+def check_token_config() -> None:
+    """Fail at startup rather than on the first login when signed mode has no secret"""
+    if TOKEN_MODE == "signed":
+        _secret()
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signature(signing_input: str) -> str:
+    return _b64encode(hmac.new(_secret(), signing_input.encode(), hashlib.sha256).digest())
+
+
+def is_signed_token(token: str) -> bool:
+    return token.startswith(TOKEN_PREFIX + ".")
+
+
+def sign_token(user: Dict[str, Any], ttl_seconds: int = TOKEN_TTL_SECONDS) -> Dict[str, Any]:
+    """Mint a signed token for a user document; returns the token and its claims"""
+    claims = {
+        "sub": str(user["_id"]),
+        "name": user.get("name"),
+        "email": user.get("email"),
+        "role": user.get("role"),
+        "exp": int(time.time()) + ttl_seconds,
+        "jti": uuid4().hex,
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    signing_input = f"{TOKEN_PREFIX}.{payload}"
+    return {"token": f"{signing_input}.{_signature(signing_input)}", "claims": claims}
+
+
+def verify_token(token: str) -> Optional[Dict[str, Any]]:
+    """Return the claims of a valid, unexpired token, or None"""
+    try:
+        prefix, payload, signature = token.split(".")
+    except ValueError:
+        return None
+    if prefix != TOKEN_PREFIX:
+        return None
+    # Compared as bytes: compare_digest rejects non-ASCII str arguments
+    expected = _signature(f"{prefix}.{payload}").encode()
+    if not hmac.compare_digest(signature.encode("utf-8", "surrogateescape"), expected):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get("exp", 0) <= time.time():
+        return None
+    return claims
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationFilter:
+    """Bloom filter of revoked token ids, periodically rebuilt from a loader"""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.01, refresh_seconds: float = 30.0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self._filter = BloomFilter(capacity, error_rate)
+        self._refreshed_at = float("-inf")
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.filter_hits = 0
+        self.false_positives = 0
+
+    def needs_refresh(self) -> bool:
+        return time.monotonic() - self._refreshed_at >= self.refresh_seconds
+
+    def refresh(self, revoked_ids: Iterable[str]) -> None:
+        """Replace the filter with one built from the currently revoked ids"""
+        ids = list(revoked_ids)
+        fresh = BloomFilter(max(self.capacity, len(ids) * 2), self.error_rate)
+        for jti in ids:
+            fresh.add(jti)
+        with self._lock:
+            self._filter = fresh
+            self._refreshed_at = time.monotonic()
+            self.refreshes += 1
+
+    def add(self, jti: str) -> None:
+        with self._lock:
+            self._filter.add(jti)
+
+    async def is_revoked(self, jti: str, confirm: Callable[[str], Awaitable[bool]]) -> bool:
+        """Check the filter; only a filter hit is confirmed with `confirm`"""
+        if jti not in self._filter:
+            return False
+        self.filter_hits += 1
+        if await confirm(jti):
+            return True
+        self.false_positives += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": self._filter.count,
+            "bits": self._filter.num_bits,
+            "hashes": self._filter.num_hashes,
+            "refreshes": self.refreshes,
+            "filter_hits": self.filter_hits,
+            "false_positives": self.false_positives,
+        }
+
+
+revocations = RevocationFilter(
+    capacity=int(os.getenv("AUTH_REVOCATION_CAPACITY", "100000")),
+    refresh_seconds=float(os.getenv("AUTH_REVOCATION_REFRESH_SECONDS", "30")),
+)
@@ -0,0 +1,74 @@
+"""
+Collection Versions
+
+Monotonic version counters bumped by every write path in main.py, kept in
+the "version" collection so all workers agree. Read endpoints derive a weak
+ETag from the request URL and the versions their data depends on; when
+the client's If-None-Match still matches, they answer 304 after a single
+point read instead of running the query.
+
+Keys are a collection name ("project") or a collection scoped to one
+project ("document:project:<id>").
+"""
+
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+VERSION_COLLECTION = "version"
+
+
+def collection_key(collection: str) -> str:
+    return collection
+
+
+def project_key(collection: str, project_id: str) -> str:
+    return f"{collection}:project:{project_id}"
+
+
+def document_key(collection: str, document_id: str) -> str:
+    return f"{collection}:{document_id}"
+
+
+class VersionStore:
+    def __init__(self):
+        self.not_modified = 0
+        self.bumps = 0
+
+    async def bump(self, db, *keys: str) -> None:
+        """Increment every key in one round trip"""
+        if not keys:
+            return
+        await db[VERSION_COLLECTION].bulk_write(
+            [UpdateOne({"_id": key}, {"$inc": {"v": 1}}, upsert=True) for key in keys],
+            ordered=False,
+        )
+        self.bumps += len(keys)
+
+    async def get(self, db, keys: Iterable[str]) -> Dict[str, int]:
+        keys = list(keys)
+        found = {d["_id"]: int(d.get("v", 0)) async for d in db[VERSION_COLLECTION].find({"_id": {"$in": keys}})}
+        return {key: found.get(key, 0) for key in keys}
+
+    async def etag(self, db, scope: str, keys: List[str]) -> str:
+        """Weak ETag for `scope` (route + query string) at the current versions of keys"""
+        current = await self.get(db, keys)
+        material = scope + "|" + ",".join(f"{k}={current[k]}" for k in sorted(current))
+        return 'W/"' + hashlib.sha1(material.encode()).hexdigest()[:20] + '"'
+
+    def stats(self) -> Dict[str, Any]:
+        return {"bumps": self.bumps, "not_modified": self.not_modified}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str, wildcard: bool = True) -> bool:
+    """`wildcard`: whether "*" matches, i.e. the resource is known to exist"""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    # Weak comparison: W/"x" and "x" match
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return (wildcard and "*" in candidates) or any((c[2:] if c.startswith("W/") else c) == bare for c in candidates)
+
+
+versions = VersionStore()
@@ -0,0 +1,206 @@
+"""
+Approval Workflows
+
+Approvable entities (expenses, leaves) move through string statuses. Each
+workflow is declared once as a transition table of
+(state, roles, action) -> next state and compiled at import into dicts:
+
+- next_state(state, role, action) is a single dict lookup.
+- candidates(role, action) lists the (state, next state) pairs a caller
+  may apply; with a single pair the transition runs without reading the
+  document first.
+
+apply() executes a transition as a find_one_and_update conditioned on the
+expected current status, so two concurrent approvers cannot both succeed.
+Only when nothing matched is the document read, to answer 404, 403 or 409;
+a role with no transition for the action gets 403 without any read.
+apply_many() does the same for a batch: one read to check every document
+against the table, then one unordered bulk_write of conditional updates.
+
+A new approvable entity only needs a table in WORKFLOWS.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+
+
+class Transition(NamedTuple):
+    state: str
+    roles: FrozenSet[str]
+    action: str
+    next: str
+
+
+class Workflow:
+    def __init__(
+        self,
+        name: str,
+        initial: str,
+        transitions: Iterable[Transition],
+        denied: Optional[Dict[str, str]] = None,
+    ):
+        self.name = name
+        self.initial = initial
+        self.denied = denied or {}
+        self._table: Dict[Tuple[str, str, str], str] = {}
+        self._candidates: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        self._actors: Dict[str, set] = {}
+        for t in transitions:
+            for role in t.roles:
+                key = (t.state, role, t.action)
+                if self._table.get(key, t.next) != t.next:
+                    raise ValueError(f"Conflicting {name} transitions for {key}")
+                self._table[key] = t.next
+                self._candidates.setdefault((role, t.action), []).append((t.state, t.next))
+            self._actors.setdefault(t.state, set()).update(t.roles)
+        self.applied = 0
+        self.conflicts = 0
+
+    def next_state(self, state: str, role: str, action: str) -> Optional[str]:
+        return self._table.get((state, role, action))
+
+    def candidates(self, role: str, action: str) -> List[Tuple[str, str]]:
+        return self._candidates.get((role, action), [])
+
+    def update(self, next_state: str, extra: Optional[Dict[str, Dict[str, Any]]] = None, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Update document moving to next_state, merged with extra operators (e.g. $push)"""
+        update: Dict[str, Dict[str, Any]] = {"$set": {"status": next_state, "updated_at": now or datetime.now(timezone.utc)}}
+        for op, fields in (extra or {}).items():
+            update.setdefault(op, {}).update(fields)
+        return update
+
+    def rejection(self, current: Optional[Dict[str, Any]], role: str, action: str) -> HTTPException:
+        """Error for a transition that did not apply, given the document's current status"""
+        if not self.candidates(role, action):
+            # The role can never take this action, whatever the document
+            return HTTPException(status_code=403, detail="Forbidden")
+        if current is None:
+            return HTTPException(status_code=404, detail=f"{self.name.capitalize()} not found")
+        state = current.get("status")
+        actors = self._actors.get(state)
+        if actors and role not in actors:
+            return HTTPException(status_code=403, detail=self.denied.get(state, "Forbidden"))
+        # Lost a race with another approver, or the document is already final
+        self.conflicts += 1
+        return HTTPException(status_code=409, detail=f"{self.name.capitalize()} is {state}")
+
+    async def apply(self, collection, doc_id: Any, role: str, action: str, extra: Optional[Dict[str, Dict[str, Any]]] = None) -> Tuple[Dict[str, Any], str]:
+        """Apply action to a document; returns it as updated and the status it left, or raises 404/403/409.
+
+        Roles with one source state (most of them) cost one round trip.
+        Roles that can act in several states read the status first and
+        apply only the transition from it, so a document another approver
+        advances in between gets 409 rather than a second step.
+        """
+        candidates = self.candidates(role, action)
+        if not candidates:
+            raise self.rejection(None, role, action)
+        if len(candidates) > 1:
+            current = await collection.find_one({"_id": doc_id}, {"status": 1})
+            next_state = self.next_state(current.get("status"), role, action) if current else None
+            if next_state is None:
+                raise self.rejection(current, role, action)
+            candidates = [(current["status"], next_state)]
+        # Exactly one candidate left
+        for state, next_state in candidates:
+            doc = await collection.find_one_and_update(
+                {"_id": doc_id, "status": state},
+                self.update(next_state, extra),
+                return_document=ReturnDocument.AFTER,
+            )
+            if doc:
+                self.applied += 1
+                return doc, state
+        current = await collection.find_one({"_id": doc_id}, {"status": 1})
+        raise self.rejection(current, role, action)
+
+    async def apply_many(
+        self,
+        collection,
+        doc_ids: Sequence[Any],
+        role: str,
+        action: str,
+        marker: Dict[str, Any],
+        extra: Optional[Dict[str, Dict[str, Any]]] = None,
+        fields: Iterable[str] = (),
+    ) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], str]]]:
+        """Apply action to each document; returns (outcome per id, applied transitions).
+
+        Outcomes carry the id, an HTTP-style code and the resulting status.
+        Applied transitions are (document as read before the update, limited
+        to `fields`, new status). A document changed by someone else between the read and the
+        write gets 409 and is not in the applied list.
+
+        `marker` is a filter matching only documents this call updated, such
+        as a batch id inside an entry that `extra` pushes. Later writes must
+        not remove it, so it tells applied items from lost races even after
+        another batch moves the document on.
+        """
+        found = {
+            doc["_id"]: doc
+            async for doc in collection.find({"_id": {"$in": list(doc_ids)}}, {"status": 1, **{f: 1 for f in fields}})
+        }
+        outcomes: List[Dict[str, Any]] = []
+        planned: Dict[Any, Dict[str, Any]] = {}
+        requests = []
+        now = datetime.now(timezone.utc)
+        for doc_id in doc_ids:
+            doc = found.get(doc_id)
+            next_state = self.next_state(doc["status"], role, action) if doc else None
+            if next_state is None:
+                error = self.rejection(doc, role, action)
+                outcomes.append({"id": str(doc_id), "code": error.status_code, "status": doc and doc.get("status"), "detail": error.detail})
+                continue
+            outcome = {"id": str(doc_id), "code": 200, "status": next_state, "detail": None}
+            outcomes.append(outcome)
+            planned[doc_id] = outcome
+            requests.append(UpdateOne({"_id": doc_id, "status": doc["status"]}, self.update(next_state, extra, now)))
+
+        if requests:
+            result = await collection.bulk_write(requests, ordered=False)
+            if result.modified_count < len(requests):
+                applied = {doc["_id"] async for doc in collection.find({"_id": {"$in": list(planned)}, **marker}, {"_id": 1})}
+                for doc_id, outcome in list(planned.items()):
+                    if doc_id not in applied:
+                        self.conflicts += 1
+                        outcome.update(code=409, status=None, detail=f"{self.name.capitalize()} changed concurrently")
+                        del planned[doc_id]
+        self.applied += len(planned)
+        return outcomes, [(found[doc_id], outcome["status"]) for doc_id, outcome in planned.items()]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"applied": self.applied, "conflicts": self.conflicts}
+
+
+# Approval flow: Engineer -> Manager -> Accountant
+_MANAGERS = frozenset({"Manager", "Admin"})
+_ACCOUNTANTS = frozenset({"Accountant", "Admin"})
+
+WORKFLOWS: Dict[str, Workflow] = {
+    "expense": Workflow(
+        "expense",
+        initial="pending_manager",
+        transitions=[
+            Transition("pending_manager", _MANAGERS, "approve", "pending_accountant"),
+            Transition("pending_manager", _MANAGERS, "reject", "rejected"),
+            Transition("pending_accountant", _ACCOUNTANTS, "approve", "approved"),
+            Transition("pending_accountant", _ACCOUNTANTS, "reject", "rejected"),
+        ],
+        denied={
+            "pending_manager": "Manager approval required",
+            "pending_accountant": "Accountant approval required",
+        },
+    ),
+    "leave": Workflow(
+        "leave",
+        initial="pending_manager",
+        transitions=[
+            Transition("pending_manager", _MANAGERS, "approve", "approved"),
+            Transition("pending_manager", _MANAGERS, "reject", "rejected"),
+        ],
+        denied={"pending_manager": "Manager approval required"},
+    ),
+}